@@ -1,37 +1,30 @@
 import streamlit as st
 import pandas as pd
-import spacy
-from spacytextblob.spacytextblob import SpacyTextBlob
-from transformers import pipeline
+import os
 import subprocess
+from model_registry import registry, preload_from_env
+from batch_engine import DEFAULT_HF_BATCH_SIZE, DEFAULT_SPACY_BATCH_SIZE, timed
+from streaming import DEFAULT_CHUNK_SIZE, read_preview, stream_score_csv
+from parallel_spacy import default_workers
+from result_cache import hit_ratio
+from quantized_engine import HF_ENGINES
+import sentiment_api
 
 def load_hf_model():
-    model_name = 'sentiment-analysis'
-    return pipeline(model_name)
+    return registry.get("hf")
+
+def load_spacy_model():
+    return registry.get("spacy")
 
 def analyze_sentiment_hf(text):
-    sentiment_pipeline = load_hf_model()
-    result = sentiment_pipeline(text)[0]
-    sentiment = result['label']
-    confidence = result['score']
-    return sentiment, confidence
+    return sentiment_api.analyze_sentiment_hf(text, use_cache=True)
 
 def download_spacy_model():
     model_name = "en_core_web_sm"
     subprocess.run(["python", "-m", "spacy", "download", model_name])
 
 def analyze_sentiment_spacy(text):
-    nlp = spacy.load("en_core_web_sm")
-    nlp.add_pipe("spacytextblob")
-    doc = nlp(text)
-    polarity = doc._.blob.polarity
-    if polarity > 0.1:
-        sentiment = "POSITIVE"
-    elif polarity < -0.1:
-        sentiment = "NEGATIVE"
-    else:
-        sentiment = "NEUTRAL"
-    return sentiment, polarity
+    return sentiment_api.analyze_sentiment_spacy(text, use_cache=True)
 
 def display_sentiment_with_color(sentiment, source):
     sentiment = sentiment.upper()
@@ -48,32 +41,28 @@ def display_sentiment_with_color(sentiment, source):
         unsafe_allow_html=True
     )
 
-def process_uploaded_file(file, analysis_method):
+def make_dataset_scorer(analysis_method, batch_size=None, workers=1, use_cache=True, cache_stats=None):
+    backend = HF_ENGINES.get(analysis_method, "spacy")
+    return sentiment_api.make_scorer(backend, batch_size, workers, use_cache, cache_stats)
+
+def display_cache_stats(cache_stats):
+    st.info(f"Result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"({hit_ratio(cache_stats):.1%} hit ratio)")
+
+def process_uploaded_file(file, analysis_method, batch_size=None, workers=1, use_cache=True):
     try:
         df = pd.read_csv(file)
         if 'text' not in df.columns:
             st.warning("Uploaded dataset must contain a 'text' column.")
             return None
 
-        results = []
-        if analysis_method == "HuggingFace":
-            sentiment_pipeline = load_hf_model()
-            for text in df['text']:
-                result = sentiment_pipeline(text)[0]
-                results.append((text, result['label'], result['score']))
-        elif analysis_method == "spaCy":
-            nlp = spacy.load("en_core_web_sm")
-            nlp.add_pipe("spacytextblob")
-            for text in df['text']:
-                doc = nlp(text)
-                polarity = doc._.blob.polarity
-                if polarity > 0.1:
-                    sentiment = "POSITIVE"
-                elif polarity < -0.1:
-                    sentiment = "NEGATIVE"
-                else:
-                    sentiment = "NEUTRAL"
-                results.append((text, sentiment, polarity))
+        cache_stats = {"hits": 0, "misses": 0}
+        score = make_dataset_scorer(analysis_method, batch_size, workers, use_cache, cache_stats)
+        results, report = timed(score, df['text'])
+
+        st.info(f"Scored {report['rows']} rows in {report['seconds']:.2f}s ({report['rows_per_sec']:.1f} rows/sec)")
+        if use_cache:
+            display_cache_stats(cache_stats)
 
         results_df = pd.DataFrame(results, columns=['Text', 'Sentiment', 'Score/Polarity'])
         return results_df
@@ -82,8 +71,42 @@ def process_uploaded_file(file, analysis_method):
         st.error(f"An error occurred: {e}")
         return None
 
+def process_uploaded_file_streaming(file, analysis_method, batch_size=None, workers=1,
+                                    output_format="csv", chunk_size=DEFAULT_CHUNK_SIZE, use_cache=True):
+    cache_stats = {"hits": 0, "misses": 0}
+    progress_bar = st.progress(0.0)
+    status = st.empty()
+
+    def on_progress(fraction, rows):
+        progress_bar.progress(fraction)
+        status.write(f"Scored {rows} rows...")
+
+    try:
+        # Loading the model can fail too (e.g. the optional ONNX engine is not installed)
+        score_chunk = make_dataset_scorer(analysis_method, batch_size, workers, use_cache, cache_stats)
+        path, rows, seconds = stream_score_csv(file, score_chunk, output_format, chunk_size, on_progress)
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+        return None
+
+    progress_bar.progress(1.0)
+    status.info(f"Scored {rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:.1f} rows/sec)")
+    if use_cache:
+        display_cache_stats(cache_stats)
+    return path
+
+def display_registry_stats():
+    stats = registry.stats()
+    with st.sidebar.expander("Model registry"):
+        st.write(f"Loaded models: {', '.join(stats['loaded']) or 'none'}")
+        st.write(f"Hit rate: {stats['hit_rate']:.1%} ({stats['hits']} hits / {stats['misses']} loads)")
+        st.write(f"Memory: {stats['memory_mb']:.0f} / {stats['max_memory_mb']} MB, evictions: {stats['evictions']}")
+        for name, seconds in stats["load_seconds"].items():
+            st.write(f"{name} load time: {seconds:.2f}s")
+
 def main():
     st.set_page_config(page_title="Sentiment Analysis")
+    preload_from_env()
 
     st.title("Welcome to the Sentiment Analysis app!")
     st.write("This app performs sentiment analysis on text using two different methods: HuggingFace and spaCy.")
@@ -117,11 +140,37 @@ def main():
     # Section 2: Dataset Sentiment Analysis
     st.header("Dataset Sentiment Analysis")
     uploaded_file = st.file_uploader("Upload a CSV file with a 'text' column:", type="csv")
-    analysis_method = st.selectbox("Select Analysis Method", ["HuggingFace", "spaCy"])
+    analysis_method = st.selectbox("Select Analysis Method", list(HF_ENGINES) + ["spaCy"])
+    default_batch_size = DEFAULT_HF_BATCH_SIZE if analysis_method in HF_ENGINES else DEFAULT_SPACY_BATCH_SIZE
+    batch_size = st.number_input("Batch size", min_value=1, max_value=4096, value=default_batch_size)
+    workers = 1
+    if analysis_method == "spaCy":
+        workers = st.number_input("spaCy worker processes", min_value=1, max_value=default_workers(), value=1)
+
+    use_cache = st.checkbox("Reuse cached results", value=True)
+    streaming_mode = st.checkbox("Streaming mode (large files)")
+    if streaming_mode:
+        output_format = st.selectbox("Results format", ["csv", "parquet"])
+        chunk_size = st.number_input("Rows per chunk", min_value=100, max_value=1000000, value=DEFAULT_CHUNK_SIZE)
 
     if st.button("Analyze Dataset"):
-        if uploaded_file:
-            result_df = process_uploaded_file(uploaded_file, analysis_method)
+        if uploaded_file and streaming_mode:
+            previous_path = st.session_state.pop("results_path", None)
+            if previous_path and os.path.exists(previous_path):
+                os.remove(previous_path)
+            results_path = process_uploaded_file_streaming(uploaded_file, analysis_method, int(batch_size), int(workers),
+                                                           output_format, int(chunk_size), use_cache)
+            if results_path is not None:
+                st.session_state.results_path = results_path
+                st.write("Analysis Results (first 100 rows):")
+                st.dataframe(read_preview(results_path))
+                mime = "text/csv" if output_format == "csv" else "application/octet-stream"
+                # st.download_button holds the whole results file in memory while serving it
+                with open(results_path, "rb") as results_file:
+                    st.download_button("Download Results", data=results_file,
+                                       file_name=f"sentiment_analysis_results.{output_format}", mime=mime)
+        elif uploaded_file:
+            result_df = process_uploaded_file(uploaded_file, analysis_method, int(batch_size), int(workers), use_cache)
             if result_df is not None:
                 st.write("Analysis Results:")
                 st.dataframe(result_df)
@@ -130,5 +179,7 @@ def main():
         else:
             st.warning("Please upload a valid CSV file.")
 
+    display_registry_stats()
+
 if __name__ == "__main__":
     main()
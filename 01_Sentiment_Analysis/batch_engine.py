@@ -0,0 +1,62 @@
+import time
+
+# Polarity thresholds used by the spaCy/TextBlob backend
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+DEFAULT_HF_BATCH_SIZE = 32
+DEFAULT_SPACY_BATCH_SIZE = 256
+
+
+def polarity_to_sentiment(polarity):
+    if polarity > POSITIVE_THRESHOLD:
+        return "POSITIVE"
+    elif polarity < NEGATIVE_THRESHOLD:
+        return "NEGATIVE"
+    return "NEUTRAL"
+
+
+def length_sorted_batches(texts, batch_size):
+    # Group texts of similar length so each padded batch wastes as few positions as possible
+    order = sorted(range(len(texts)), key=lambda i: len(str(texts[i])))
+    for start in range(0, len(order), batch_size):
+        yield order[start:start + batch_size]
+
+
+def score_hf_batched(texts, sentiment_pipeline, batch_size=DEFAULT_HF_BATCH_SIZE):
+    texts = list(texts)
+    results = [None] * len(texts)
+    for indices in length_sorted_batches(texts, batch_size):
+        batch = [texts[i] for i in indices]
+        outputs = sentiment_pipeline(batch, batch_size=batch_size, truncation=True)
+        # Scatter back to the original positions so the output order matches the input
+        for i, output in zip(indices, outputs):
+            results[i] = (texts[i], output['label'], output['score'])
+    return results
+
+
+def score_spacy_batched(texts, nlp, batch_size=DEFAULT_SPACY_BATCH_SIZE, n_process=1):
+    texts = list(texts)
+    # spacytextblob only reads doc.text, so the tagger, parser, NER etc. can be skipped
+    disabled = [name for name in nlp.pipe_names if name != "spacytextblob"]
+    results = []
+    # nlp.pipe yields docs in input order, also when n_process > 1
+    for text, doc in zip(texts, nlp.pipe(texts, batch_size=batch_size, n_process=n_process, disable=disabled)):
+        polarity = doc._.blob.polarity
+        results.append((text, polarity_to_sentiment(polarity), polarity))
+    return results
+
+
+def throughput_report(rows, seconds):
+    return {
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds > 0 else float("inf"),
+    }
+
+
+def timed(score_fn, texts, *args, **kwargs):
+    texts = list(texts)
+    start = time.perf_counter()
+    results = score_fn(texts, *args, **kwargs)
+    return results, throughput_report(len(texts), time.perf_counter() - start)
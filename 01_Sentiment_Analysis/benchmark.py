@@ -0,0 +1,194 @@
+import argparse
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+# Offline benchmark for the sentiment backends.
+# Each (backend, batch size, corpus) run happens in a fresh subprocess so cold-start time and
+# peak RSS are measured from a clean interpreter. Results are written to JSON and can be
+# compared against a previous run to catch regressions.
+#
+#   python benchmark.py --backends hf spacy --sizes 1000 10000 --output bench.json
+#   python benchmark.py --output new.json --compare bench.json
+
+POSITIVE_WORDS = ["great", "excellent", "love", "happy", "wonderful", "fantastic", "good", "amazing", "pleasant", "reliable"]
+NEGATIVE_WORDS = ["terrible", "awful", "hate", "sad", "horrible", "bad", "poor", "disappointing", "broken", "slow"]
+NEUTRAL_WORDS = ["the", "order", "arrived", "on", "tuesday", "package", "store", "phone", "service", "with", "a",
+                 "customer", "product", "delivery", "and", "it", "was", "we", "they", "after", "week", "team"]
+
+# name -> (min words, max words)
+LENGTH_DISTRIBUTIONS = {
+    "short": (5, 15),
+    "medium": (30, 80),
+    "long": (200, 400),
+}
+DEFAULT_SIZES = [100, 1000, 10000]
+DEFAULT_BATCH_SIZES = {"hf": [1, 32], "spacy": [256]}
+LATENCY_SAMPLE = 200
+REGRESSION_TOLERANCE = 0.10
+
+
+def synthetic_corpus(size, distribution="medium", seed=0):
+    rng = random.Random(f"{seed}-{distribution}-{size}")
+    if distribution == "mixed":
+        distributions = list(LENGTH_DISTRIBUTIONS)
+        return [synthetic_text(rng, *LENGTH_DISTRIBUTIONS[rng.choice(distributions)]) for _ in range(size)]
+    return [synthetic_text(rng, *LENGTH_DISTRIBUTIONS[distribution]) for _ in range(size)]
+
+
+def synthetic_text(rng, min_words, max_words):
+    polarity_words = rng.choice([POSITIVE_WORDS, NEGATIVE_WORDS, NEUTRAL_WORDS])
+    words = [rng.choice(polarity_words if rng.random() < 0.2 else NEUTRAL_WORDS)
+             for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_one(backend, batch_size, size, distribution, seed):
+    import sentiment_api
+    from model_registry import registry
+
+    texts = synthetic_corpus(size, distribution, seed)
+
+    start = time.perf_counter()
+    score = sentiment_api.make_scorer(backend, batch_size=batch_size, use_cache=False)
+    registry.get(backend)
+    cold_start = time.perf_counter() - start
+
+    # Per-row latency of the single-text path
+    latencies = []
+    for text in texts[:LATENCY_SAMPLE]:
+        row_start = time.perf_counter()
+        score([text])
+        latencies.append(1000 * (time.perf_counter() - row_start))
+
+    # Throughput of the dataset path
+    start = time.perf_counter()
+    score(texts)
+    seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "batch_size": batch_size,
+        "size": size,
+        "distribution": distribution,
+        "cold_start_seconds": cold_start,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        },
+        "rows_per_sec": size / seconds if seconds else None,
+        "seconds": seconds,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_isolated(backend, batch_size, size, distribution, seed):
+    config = json.dumps({"backend": backend, "batch_size": batch_size, "size": size,
+                         "distribution": distribution, "seed": seed})
+    completed = subprocess.run([sys.executable, __file__, "--run-one", config],
+                               capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_key(result):
+    return (result["backend"], result["batch_size"], result["size"], result["distribution"])
+
+
+def compare(current, baseline, tolerance=REGRESSION_TOLERANCE):
+    # Flags throughput drops and p95 latency increases beyond the tolerance.
+    # Returns (regressions, missing); runs without a measurement on either side are listed as missing.
+    previous = {run_key(result): result for result in baseline["results"]}
+    regressions, missing = [], []
+    for result in current["results"]:
+        old = previous.get(run_key(result))
+        if old is None:
+            continue
+        if old["rows_per_sec"] is None or result["rows_per_sec"] is None:
+            missing.append(f"{run_key(result)} throughput")
+        elif old["rows_per_sec"] and result["rows_per_sec"] < old["rows_per_sec"] * (1 - tolerance):
+            regressions.append(f"{run_key(result)} throughput {old['rows_per_sec']:.1f} -> {result['rows_per_sec']:.1f} rows/sec")
+        if old["latency_ms"]["p95"] is None or result["latency_ms"]["p95"] is None:
+            missing.append(f"{run_key(result)} p95 latency")
+        elif old["latency_ms"]["p95"] and result["latency_ms"]["p95"] > old["latency_ms"]["p95"] * (1 + tolerance):
+            regressions.append(f"{run_key(result)} p95 latency {old['latency_ms']['p95']:.2f} -> {result['latency_ms']['p95']:.2f} ms")
+    return regressions, missing
+
+
+def format_number(value, spec):
+    return "n/a" if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sentiment backends on synthetic corpora.")
+    parser.add_argument("--backends", nargs="+", default=["hf", "spacy"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--distributions", nargs="+", default=["short", "medium", "mixed"],
+                        choices=list(LENGTH_DISTRIBUTIONS) + ["mixed"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, help="override the per-backend defaults")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results JSON to check for regressions")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        config = json.loads(args.run_one)
+        print(json.dumps(run_one(**config)))
+        return
+
+    results = []
+    for backend in args.backends:
+        for batch_size in args.batch_sizes or DEFAULT_BATCH_SIZES.get(backend, [32]):
+            for distribution in args.distributions:
+                for size in args.sizes:
+                    result = run_isolated(backend, batch_size, size, distribution, args.seed)
+                    results.append(result)
+                    print(f"{backend:<8} batch={batch_size:<5} {distribution:<7} n={size:<7} "
+                          f"cold={result['cold_start_seconds']:.2f}s p50={format_number(result['latency_ms']['p50'], '.2f')}ms "
+                          f"p95={format_number(result['latency_ms']['p95'], '.2f')}ms {format_number(result['rows_per_sec'], '.1f')} rows/sec "
+                          f"rss={result['peak_rss_mb']:.0f}MB")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions, missing = compare(report, json.load(f))
+        for entry in missing:
+            print(f"MISSING: {entry} (not measured in one of the runs)")
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
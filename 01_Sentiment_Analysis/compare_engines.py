@@ -0,0 +1,71 @@
+import argparse
+import json
+
+import pandas as pd
+
+from batch_engine import DEFAULT_HF_BATCH_SIZE, score_hf_batched, timed
+from model_registry import registry
+from quantized_engine import HF_ENGINES
+
+# Accuracy parity and latency/throughput of the int8 and ONNX engines against the fp32 pipeline.
+# Usage: python compare_engines.py sample.csv --limit 2000 --batch-size 32
+
+
+def parity(reference, candidate):
+    agree = sum(1 for r, c in zip(reference, candidate) if r[1] == c[1])
+    score_diffs = [abs(r[2] - c[2]) for r, c in zip(reference, candidate)]
+    return {
+        "label_agreement": agree / len(reference) if reference else 1.0,
+        "mean_abs_score_diff": sum(score_diffs) / len(score_diffs) if score_diffs else 0.0,
+        "max_abs_score_diff": max(score_diffs, default=0.0),
+    }
+
+
+def compare(texts, engines, batch_size=DEFAULT_HF_BATCH_SIZE):
+    report = {}
+    reference = None
+    for label in engines:
+        key = HF_ENGINES[label]
+        # Warm-up pass so one-off graph/kernel initialisation is not counted as latency
+        score_hf_batched(texts[:batch_size], registry.get(key), batch_size=batch_size)
+        results, throughput = timed(score_hf_batched, texts, registry.get(key), batch_size=batch_size)
+        entry = {
+            "load_seconds": registry.load_seconds.get(key),
+            "rows_per_sec": throughput["rows_per_sec"],
+            "ms_per_row": 1000 * throughput["seconds"] / max(len(texts), 1),
+        }
+        if reference is None:
+            reference = results
+        else:
+            entry.update(parity(reference, results))
+        report[label] = entry
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HuggingFace inference engines on a sample CSV.")
+    parser.add_argument("csv", help="CSV file with a text column")
+    parser.add_argument("--text-column", default="text")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_HF_BATCH_SIZE)
+    parser.add_argument("--engines", nargs="+", default=list(HF_ENGINES), choices=list(HF_ENGINES),
+                        help="the first engine is the reference for the parity check")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    texts = pd.read_csv(args.csv, nrows=args.limit)[args.text_column].astype(str).tolist()
+    report = compare(texts, args.engines, args.batch_size)
+
+    for label, entry in report.items():
+        line = f"{label:<22} {entry['rows_per_sec']:>9.1f} rows/sec {entry['ms_per_row']:>8.2f} ms/row"
+        if "label_agreement" in entry:
+            line += f"  agreement {entry['label_agreement']:.2%}  max score diff {entry['max_abs_score_diff']:.4f}"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from quantized_engine import load_int8_pipeline, load_onnx_pipeline
+
+# Process-wide registry of sentiment models.
+# Streamlit re-executes app.py on every interaction, but imported modules stay in
+# sys.modules, so anything stored here is loaded once per process and shared by
+# every rerun and every session.
+
+DEFAULT_MAX_MEMORY_MB = int(os.environ.get("SENTIMENT_REGISTRY_MAX_MB", "2048"))
+SPACY_MODEL_NAME = "en_core_web_sm"
+
+
+def load_hf_model(model_name=None):
+    from transformers import pipeline
+    if model_name:
+        return pipeline("sentiment-analysis", model=model_name)
+    return pipeline("sentiment-analysis")
+
+
+def load_spacy_model(model_name=SPACY_MODEL_NAME):
+    import spacy
+    from spacytextblob.spacytextblob import SpacyTextBlob  # registers the "spacytextblob" factory
+    nlp = spacy.load(model_name)
+    nlp.add_pipe("spacytextblob")
+    return nlp
+
+
+def estimate_size_mb(model):
+    # torch pipelines expose their parameters; everything else falls back to the declared size
+    inner = getattr(model, "model", None)
+    if inner is not None and hasattr(inner, "parameters"):
+        try:
+            return sum(p.numel() * p.element_size() for p in inner.parameters()) / (1024 * 1024)
+        except Exception:
+            return None
+    return None
+
+
+class ModelRegistry:
+    def __init__(self, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+        self.max_memory_mb = max_memory_mb
+        self._loaders = {}
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = {}
+
+    def register(self, name, loader, size_mb=0, pinned=False):
+        # pinned models are never evicted; extra models are dropped LRU-first when over budget
+        with self._lock:
+            self._loaders[name] = {"loader": loader, "size_mb": size_mb, "pinned": pinned}
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        with self._lock:
+            if name in self._models:
+                self.hits += 1
+                self._models.move_to_end(name)
+                return self._models[name]
+            if name not in self._loaders:
+                raise KeyError(f"Unknown model '{name}'. Registered models: {sorted(self._loaders)}")
+
+            self.misses += 1
+            entry = self._loaders[name]
+            start = time.perf_counter()
+            model = entry["loader"]()
+            self.load_seconds[name] = time.perf_counter() - start
+
+            size_mb = estimate_size_mb(model)
+            self._sizes[name] = size_mb if size_mb is not None else entry["size_mb"]
+            self._models[name] = model
+            self._evict_over_budget(keep=name)
+            return model
+
+    def preload(self, names=None):
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def evict(self, name):
+        with self._lock:
+            if self._models.pop(name, None) is not None:
+                self._sizes.pop(name, None)
+                self.evictions += 1
+
+    def memory_mb(self):
+        return sum(self._sizes.get(name, 0) for name in self._models)
+
+    def _evict_over_budget(self, keep):
+        for name in list(self._models):
+            if self.memory_mb() <= self.max_memory_mb:
+                break
+            if name == keep or self._loaders[name]["pinned"]:
+                continue
+            self.evict(name)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "loaded": list(self._models),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "evictions": self.evictions,
+            "load_seconds": dict(self.load_seconds),
+            "memory_mb": self.memory_mb(),
+            "max_memory_mb": self.max_memory_mb,
+        }
+
+
+registry = ModelRegistry()
+registry.register("hf", load_hf_model, size_mb=260, pinned=True)
+registry.register("spacy", load_spacy_model, size_mb=50, pinned=True)
+registry.register("hf-int8", load_int8_pipeline, size_mb=70)
+registry.register("hf-onnx", load_onnx_pipeline, size_mb=260)
+
+
+def register_hf_model(model_name, size_mb=0):
+    # Extra HuggingFace checkpoints are registered unpinned so they are subject to LRU eviction
+    registry.register(model_name, lambda: load_hf_model(model_name), size_mb=size_mb)
+    return model_name
+
+
+def preload_from_env(var="SENTIMENT_PRELOAD"):
+    # e.g. SENTIMENT_PRELOAD=hf,spacy warms both backends when the app starts
+    names = [name.strip() for name in os.environ.get(var, "").split(",") if name.strip()]
+    if names:
+        registry.preload(names)
+    return names
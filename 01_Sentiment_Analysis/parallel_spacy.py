@@ -0,0 +1,60 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_engine import DEFAULT_SPACY_BATCH_SIZE, polarity_to_sentiment
+from model_registry import SPACY_MODEL_NAME, load_spacy_model
+
+# spaCy + TextBlob scoring is pure Python and holds the GIL, so the text column is
+# sharded across worker processes. Each worker loads the spaCy pipeline once in its
+# initializer and keeps it for the lifetime of the pool.
+
+DEFAULT_SHARD_SIZE = 2000
+
+_worker_nlp = None
+_pools = {}
+
+
+def _init_worker(model_name):
+    global _worker_nlp
+    _worker_nlp = load_spacy_model(model_name)
+
+
+def _score_shard(args):
+    texts, batch_size = args
+    disabled = [name for name in _worker_nlp.pipe_names if name != "spacytextblob"]
+    # Only the polarities travel back to the parent; labels are rebuilt there
+    return [doc._.blob.polarity for doc in _worker_nlp.pipe(texts, batch_size=batch_size, disable=disabled)]
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def get_pool(workers, model_name=SPACY_MODEL_NAME):
+    # Pools are reused across runs so workers do not reload the model for every dataset
+    key = (workers, model_name)
+    if key not in _pools:
+        _pools[key] = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_name,))
+    return _pools[key]
+
+
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown(cancel_futures=True)
+    _pools.clear()
+
+
+atexit.register(shutdown_pools)
+
+
+def score_spacy_parallel(texts, workers=None, batch_size=DEFAULT_SPACY_BATCH_SIZE,
+                         shard_size=DEFAULT_SHARD_SIZE, model_name=SPACY_MODEL_NAME):
+    texts = list(texts)
+    workers = workers or default_workers()
+    shards = [(texts[start:start + shard_size], batch_size) for start in range(0, len(texts), shard_size)]
+    polarities = []
+    # executor.map returns shard results in submission order, which keeps the original row order
+    for shard_polarities in get_pool(workers, model_name).map(_score_shard, shards):
+        polarities.extend(shard_polarities)
+    return [(text, polarity_to_sentiment(polarity), polarity) for text, polarity in zip(texts, polarities)]
@@ -0,0 +1,85 @@
+import os
+import shutil
+
+# CPU inference engines for the HuggingFace sentiment backend.
+# "int8" applies PyTorch dynamic quantization to the Linear layers of the default
+# pipeline model; "onnx" exports the same checkpoint to ONNX Runtime (needs the optional
+# optimum[onnxruntime] package). The export is saved under ONNX_EXPORT_DIR and reused.
+
+DEFAULT_HF_MODEL_ID = "distilbert-base-uncased-finetuned-sst-2-english"
+DEFAULT_THREADS = int(os.environ.get("SENTIMENT_INFERENCE_THREADS", str(os.cpu_count() or 1)))
+ONNX_EXPORT_DIR = os.environ.get(
+    "SENTIMENT_ONNX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".onnx_models"))
+
+
+class ThreadLimitedPipeline:
+    # torch.set_num_threads is process-wide, so the int8 thread count is only applied while
+    # this pipeline runs and the previous value is restored afterwards (the fp32 engine keeps its own)
+    def __init__(self, sentiment_pipeline, threads):
+        self.pipeline = sentiment_pipeline
+        self.threads = threads
+
+    def __call__(self, *args, **kwargs):
+        import torch
+        previous = torch.get_num_threads()
+        torch.set_num_threads(self.threads)
+        try:
+            return self.pipeline(*args, **kwargs)
+        finally:
+            torch.set_num_threads(previous)
+
+    def __getattr__(self, name):
+        # model, tokenizer, ... come from the wrapped pipeline
+        return getattr(self.pipeline, name)
+
+
+def load_int8_pipeline(model_id=DEFAULT_HF_MODEL_ID, threads=DEFAULT_THREADS):
+    import torch
+    from transformers import pipeline
+    sentiment_pipeline = pipeline("sentiment-analysis", model=model_id)
+    sentiment_pipeline.model = torch.quantization.quantize_dynamic(
+        sentiment_pipeline.model, {torch.nn.Linear}, dtype=torch.qint8)
+    return ThreadLimitedPipeline(sentiment_pipeline, threads)
+
+
+def onnx_export_path(model_id, export_dir=ONNX_EXPORT_DIR):
+    # One directory per model id and hub revision, so a new checkpoint is exported again
+    from transformers import AutoConfig
+    revision = getattr(AutoConfig.from_pretrained(model_id), "_commit_hash", None) or "local"
+    return os.path.join(export_dir, f"{model_id.replace('/', '--')}@{revision}")
+
+
+def load_onnx_pipeline(model_id=DEFAULT_HF_MODEL_ID, threads=DEFAULT_THREADS, export_dir=ONNX_EXPORT_DIR):
+    try:
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError as e:
+        raise ImportError("The ONNX engine needs the optional optimum[onnxruntime] package: "
+                          "pip install \"optimum[onnxruntime]\"") from e
+    from transformers import AutoTokenizer, pipeline
+    session_options = onnxruntime.SessionOptions()
+    session_options.intra_op_num_threads = threads
+    session_options.inter_op_num_threads = 1
+
+    path = onnx_export_path(model_id, export_dir)
+    if not os.path.exists(os.path.join(path, "model.onnx")):
+        # Export once into a temporary directory, then move it into place
+        model = ORTModelForSequenceClassification.from_pretrained(model_id, export=True)
+        staging = f"{path}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        model.save_pretrained(staging)
+        AutoTokenizer.from_pretrained(model_id).save_pretrained(staging)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(staging, path)
+    model = ORTModelForSequenceClassification.from_pretrained(
+        path, session_options=session_options, provider="CPUExecutionProvider")
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+
+# analysis_method label in the UI -> model registry key
+HF_ENGINES = {
+    "HuggingFace": "hf",
+    "HuggingFace (int8)": "hf-int8",
+    "HuggingFace (ONNX)": "hf-onnx",
+}
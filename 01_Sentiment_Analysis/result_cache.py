@@ -0,0 +1,131 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Persistent cache of sentiment results keyed by (backend, model revision, normalized text hash).
+# Rows that were already scored by the same model are answered from SQLite and skip inference.
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "SENTIMENT_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sentiment_cache.sqlite3"))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("SENTIMENT_CACHE_MAX_ENTRIES", "1000000"))
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+# Eviction trims the cache to this fraction of max_entries, so the exact row count is only
+# taken again after that many new rows rather than on every store
+EVICT_TO_FRACTION = 0.9
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", str(text)).strip()
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def hf_revision(sentiment_pipeline):
+    config = sentiment_pipeline.model.config
+    return f"{config._name_or_path}@{getattr(config, '_commit_hash', None) or 'local'}"
+
+
+def spacy_revision(model_name="en_core_web_sm"):
+    # Read from package metadata so the parent process does not need to load the spaCy model
+    from importlib.metadata import version
+    return f"{model_name}@{version(model_name)}+spacytextblob@{version('spacytextblob')}"
+
+
+class ResultCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "backend TEXT, revision TEXT, text_hash TEXT, label TEXT, score REAL, last_used REAL, "
+            "PRIMARY KEY (backend, revision, text_hash))")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._conn.commit()
+        # Running upper bound on the row count (replaced rows are counted as new);
+        # recounted exactly only when it passes max_entries
+        self._count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def lookup(self, backend, revision, hashes):
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique), LOOKUP_BATCH_SIZE):
+                batch = unique[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, label, score FROM results "
+                    f"WHERE backend = ? AND revision = ? AND text_hash IN ({placeholders})",
+                    [backend, revision, *batch]).fetchall()
+                found.update({row[0]: (row[1], row[2]) for row in rows})
+                self._conn.execute(
+                    f"UPDATE results SET last_used = ? "
+                    f"WHERE backend = ? AND revision = ? AND text_hash IN ({placeholders})",
+                    [now, backend, revision, *batch])
+            self._conn.commit()
+        return found
+
+    def store(self, backend, revision, entries):
+        # entries: {text_hash: (label, score)}
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                [(backend, revision, key, label, float(score), now) for key, (label, score) in entries.items()])
+            self._count += len(entries)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count > self.max_entries:
+            target = int(self.max_entries * EVICT_TO_FRACTION)
+            self._conn.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_used LIMIT ?)",
+                (count - target,))
+            count = target
+        self._count = count
+
+    def score(self, texts, backend, revision, score_fn):
+        # score_fn gets only the uncached texts and returns (text, label, score) tuples in order
+        texts = list(texts)
+        hashes = [text_hash(text) for text in texts]
+        cached = self.lookup(backend, revision, hashes)
+
+        missing = {}
+        for text, key in zip(texts, hashes):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            computed = {key: (label, score) for key, (_, label, score) in zip(missing, score_fn(list(missing.values())))}
+            self.store(backend, revision, computed)
+            cached.update(computed)
+
+        hits = sum(1 for key in hashes if key not in missing)
+        results = [(text, *cached[key]) for text, key in zip(texts, hashes)]
+        return results, {"hits": hits, "misses": len(texts) - hits}
+
+    def size(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+            self._count = 0
+
+
+def hit_ratio(stats):
+    total = stats["hits"] + stats["misses"]
+    return stats["hits"] / total if total else 0.0
@@ -0,0 +1,198 @@
+import argparse
+import csv
+import json
+import sys
+import time
+
+from batch_engine import (DEFAULT_HF_BATCH_SIZE, DEFAULT_SPACY_BATCH_SIZE, polarity_to_sentiment,
+                          score_hf_batched, score_spacy_batched)
+from model_registry import registry
+from parallel_spacy import score_spacy_parallel
+from result_cache import ResultCache, hf_revision, spacy_revision
+
+# Headless sentiment scoring: importable library API and command-line entry point.
+# Only the standard library is imported here; transformers, spaCy and torch are loaded
+# lazily through the model registry the first time a backend is used. Streamlit is never imported.
+#
+#   python sentiment_api.py reviews.csv --backend hf --batch-size 64 > scored.csv
+#   cat tweets.jsonl | python sentiment_api.py --format jsonl --backend spacy --workers 8
+#   python sentiment_api.py reviews.json --output-format csv > scored.csv
+
+BACKENDS = ("hf", "hf-int8", "hf-onnx", "spacy")
+FORMATS = ("csv", "jsonl", "json")
+# Fields added to every record, after the input fields in CSV output
+OUTPUT_FIELDS = ["sentiment", "score"]
+DEFAULT_CHUNK_SIZE = 1000
+
+_result_cache = None
+
+
+def get_result_cache():
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache()
+    return _result_cache
+
+
+def score_spacy_dataset(texts, batch_size=None, workers=1):
+    batch_size = batch_size or DEFAULT_SPACY_BATCH_SIZE
+    if workers > 1:
+        return score_spacy_parallel(texts, workers=workers, batch_size=batch_size)
+    return score_spacy_batched(texts, registry.get("spacy"), batch_size=batch_size)
+
+
+def make_scorer(backend="hf", batch_size=None, workers=1, use_cache=False, cache_stats=None):
+    # Returns a function mapping a list of texts to (text, sentiment, score) tuples in the same order
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Choose one of {', '.join(BACKENDS)}.")
+
+    if backend == "spacy":
+        score = lambda texts: score_spacy_dataset(texts, batch_size=batch_size, workers=workers)
+    else:
+        sentiment_pipeline = registry.get(backend)
+        score = lambda texts: score_hf_batched(texts, sentiment_pipeline, batch_size=batch_size or DEFAULT_HF_BATCH_SIZE)
+
+    if not use_cache:
+        return score
+
+    revision = spacy_revision() if backend == "spacy" else hf_revision(registry.get(backend))
+    cache = get_result_cache()
+
+    def cached_score(texts):
+        results, stats = cache.score(texts, backend, revision, score)
+        if cache_stats is not None:
+            cache_stats["hits"] += stats["hits"]
+            cache_stats["misses"] += stats["misses"]
+        return results
+
+    return cached_score
+
+
+def analyze(texts, backend="hf", batch_size=None, workers=1, use_cache=False):
+    return make_scorer(backend, batch_size, workers, use_cache)(list(texts))
+
+
+def analyze_sentiment_hf(text, use_cache=False):
+    _, sentiment, confidence = analyze([text], "hf", use_cache=use_cache)[0]
+    return sentiment, confidence
+
+
+def analyze_sentiment_spacy(text, use_cache=False):
+    def score(texts):
+        nlp = registry.get("spacy")
+        polarities = [nlp(t)._.blob.polarity for t in texts]
+        return [(t, polarity_to_sentiment(p), p) for t, p in zip(texts, polarities)]
+
+    if use_cache:
+        results, _ = get_result_cache().score([text], "spacy", spacy_revision(), score)
+    else:
+        results = score([text])
+    _, sentiment, polarity = results[0]
+    return sentiment, polarity
+
+
+def read_records(stream, input_format):
+    if input_format == "jsonl":
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    elif input_format == "json":
+        # A JSON array of objects has to be parsed whole; use JSONL for inputs that do not fit in memory
+        records = json.load(stream)
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise ValueError("JSON input must be an array of objects.")
+        yield from records
+    else:
+        yield from csv.DictReader(stream)
+
+
+def chunked(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_records(records, score, text_field="text", chunk_size=DEFAULT_CHUNK_SIZE):
+    # Streams records through the scorer a chunk at a time, adding "sentiment" and "score" fields
+    for chunk in chunked(records, chunk_size):
+        if any(text_field not in record for record in chunk):
+            raise ValueError(f"Input records must contain a '{text_field}' field.")
+        results = score([str(record[text_field]) for record in chunk])
+        for record, (_, sentiment, value) in zip(chunk, results):
+            record["sentiment"] = sentiment
+            record["score"] = value
+            yield record
+
+
+def write_records(records, stream, output_format):
+    writer = None
+    count = 0
+    if output_format == "json":
+        stream.write("[")
+    for record in records:
+        if output_format == "jsonl":
+            stream.write(json.dumps(record) + "\n")
+        elif output_format == "json":
+            stream.write(("," if count else "") + "\n" + json.dumps(record))
+        else:
+            if writer is None:
+                # Fixed schema: the first record's input fields, then the scores. Fields that only
+                # appear in later (JSON) records are dropped and missing ones are left empty.
+                fieldnames = [field for field in record if field not in OUTPUT_FIELDS] + OUTPUT_FIELDS
+                writer = csv.DictWriter(stream, fieldnames=fieldnames, extrasaction="ignore")
+                writer.writeheader()
+            writer.writerow(record)
+        count += 1
+    if output_format == "json":
+        stream.write("\n]\n")
+    stream.flush()
+    return count
+
+
+def infer_format(path):
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "json" if path.endswith(".json") else "csv"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score the sentiment of CSV, JSONL or JSON array records.")
+    parser.add_argument("input", nargs="?", default="-", help="input file, or - for stdin (default)")
+    parser.add_argument("--format", choices=FORMATS, help="input format (default: from extension, else csv)")
+    parser.add_argument("--output-format", choices=FORMATS, help="output format (default: input format)")
+    parser.add_argument("--backend", choices=BACKENDS, default="hf")
+    parser.add_argument("--text-field", default="text")
+    parser.add_argument("--batch-size", type=int, help="model batch size")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the spaCy backend")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="records read per chunk")
+    parser.add_argument("--cache", action="store_true", help="reuse and update the on-disk result cache")
+    args = parser.parse_args(argv)
+
+    input_format = args.format or ("csv" if args.input == "-" else infer_format(args.input))
+    output_format = args.output_format or input_format
+    cache_stats = {"hits": 0, "misses": 0}
+    score = make_scorer(args.backend, args.batch_size, args.workers, args.cache, cache_stats)
+
+    stream = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        records = score_records(read_records(stream, input_format), score, args.text_field, args.chunk_size)
+        count = write_records(records, sys.stdout, output_format)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    seconds = time.perf_counter() - start
+    print(f"Scored {count} rows in {seconds:.2f}s ({count / seconds if seconds else 0:.1f} rows/sec)", file=sys.stderr)
+    if args.cache:
+        total = cache_stats["hits"] + cache_stats["misses"]
+        print(f"Result cache: {cache_stats['hits']}/{total} hits", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
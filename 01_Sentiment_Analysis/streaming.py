@@ -0,0 +1,82 @@
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 5000
+RESULT_COLUMNS = ['Text', 'Sentiment', 'Score/Polarity']
+# Fixed output dtypes, so every chunk has the same schema whatever pandas infers for it
+RESULT_DTYPES = {'Text': 'string', 'Sentiment': 'string', 'Score/Polarity': 'float64'}
+
+
+def file_size(file):
+    size = getattr(file, "size", None)
+    if size is not None:
+        return size
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+class ResultWriter:
+    # Appends scored chunks to a temp file so the full result never has to sit in memory
+    def __init__(self, output_format="csv"):
+        if output_format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.output_format = output_format
+        fd, self.path = tempfile.mkstemp(prefix="sentiment_results_", suffix=f".{output_format}")
+        os.close(fd)
+        self.rows = 0
+        self._parquet_writer = None
+
+    def write(self, results):
+        chunk_df = pd.DataFrame(results, columns=RESULT_COLUMNS).astype(RESULT_DTYPES)
+        if self.output_format == "csv":
+            chunk_df.to_csv(self.path, mode="a", header=self.rows == 0, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            schema = pa.schema([('Text', pa.string()), ('Sentiment', pa.string()), ('Score/Polarity', pa.float64())])
+            table = pa.Table.from_pandas(chunk_df, schema=schema, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, schema)
+            self._parquet_writer.write_table(table)
+        self.rows += len(chunk_df)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+
+def stream_score_csv(file, score_chunk, output_format="csv", chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None):
+    # score_chunk takes a list of texts and returns (text, sentiment, score) tuples in the same order
+    total_bytes = file_size(file) or 1
+    writer = ResultWriter(output_format)
+    start = time.perf_counter()
+    try:
+        for chunk in pd.read_csv(file, chunksize=chunk_size):
+            if 'text' not in chunk.columns:
+                raise ValueError("Uploaded dataset must contain a 'text' column.")
+            writer.write(score_chunk(chunk['text'].tolist()))
+            if on_progress is not None:
+                # The reader buffers ahead, so the byte offset is an estimate of the fraction consumed
+                on_progress(min(file.tell() / total_bytes, 1.0), writer.rows)
+    except Exception:
+        writer.close()
+        os.remove(writer.path)
+        raise
+    writer.close()
+    return writer.path, writer.rows, time.perf_counter() - start
+
+
+def read_preview(path, rows=100):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        batch = next(parquet_file.iter_batches(batch_size=rows), None)
+        return batch.to_pandas() if batch is not None else pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.read_csv(path, nrows=rows)
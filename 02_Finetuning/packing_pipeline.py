@@ -0,0 +1,195 @@
+import argparse
+import bisect
+import hashlib
+import json
+import os
+
+from prompt_template import generate_prompt, template_hash
+
+# Sequence packing for the Gemma LoRA fine-tuning run.
+# The notebook pads every example to max_length=512, so most of each batch is pad tokens.
+# This pipeline builds the generate_prompt texts and tokenizes them in parallel with
+# datasets.map(num_proc=...). It then packs several conversations into each fixed-length row
+# (best-fit decreasing). Each packed row keeps its boundaries:
+#   - position_ids restart at 0 for every conversation
+#   - the first token of every conversation has label -100, so no loss crosses a boundary
+#   - sequence_lengths lets PackedCollator build a block-diagonal causal attention mask
+# The packed Arrow dataset is saved to disk, keyed by the tokenizer, the prompt template, the
+# source dataset fingerprint and max_length, and is reused on later runs.
+
+IGNORE_INDEX = -100
+DEFAULT_MAX_LENGTH = 512
+PACKED_DATASET_DIR = os.environ.get(
+    "PACKED_DATASET_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "packed_datasets"))
+# Bump when the packed layout changes
+PACKING_VERSION = 1
+
+
+def tokenizer_hash(tokenizer):
+    digest = hashlib.sha256()
+    digest.update(f"{tokenizer.__class__.__name__}\x00{tokenizer.name_or_path}\x00{len(tokenizer)}".encode("utf-8"))
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        digest.update(backend.to_str().encode("utf-8"))
+    else:
+        digest.update(json.dumps(tokenizer.get_vocab(), sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def cache_key(dataset, tokenizer, max_length):
+    payload = f"{tokenizer_hash(tokenizer)}-{template_hash()}-{dataset._fingerprint}-{max_length}-v{PACKING_VERSION}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+def add_prompts(dataset, num_proc=None):
+    return dataset.map(lambda data_point: {"prompt": generate_prompt(data_point)}, num_proc=num_proc,
+                       desc="Building prompts")
+
+
+def tokenize_prompts(dataset, tokenizer, max_length=DEFAULT_MAX_LENGTH, num_proc=None):
+    # No padding here; every conversation ends with EOS so packed neighbours stay separated
+    eos = tokenizer.eos_token_id
+
+    def tokenize_batch(batch):
+        input_ids = tokenizer(batch["prompt"], truncation=True, max_length=max_length - 1)["input_ids"]
+        input_ids = [ids if ids and ids[-1] == eos else ids + [eos] for ids in input_ids]
+        return {"input_ids": input_ids, "length": [len(ids) for ids in input_ids]}
+
+    return dataset.map(tokenize_batch, batched=True, num_proc=num_proc, remove_columns=dataset.column_names,
+                       desc="Tokenizing")
+
+
+def pack_lengths(lengths, max_length=DEFAULT_MAX_LENGTH):
+    # Best-fit decreasing bin packing; returns a list of bins, each a list of example indices
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    bins = []
+    # Sorted (remaining space, bin id) pairs, so the tightest bin that fits is found by bisect
+    space = []
+    for i in order:
+        length = min(lengths[i], max_length)
+        position = bisect.bisect_left(space, (length, -1))
+        if position < len(space):
+            remaining, bin_id = space.pop(position)
+        else:
+            remaining, bin_id = max_length, len(bins)
+            bins.append([])
+        bins[bin_id].append(i)
+        if remaining - length > 0:
+            bisect.insort(space, (remaining - length, bin_id))
+    return bins
+
+
+def packed_rows(tokenized, bins, max_length=DEFAULT_MAX_LENGTH):
+    for members in bins:
+        input_ids, labels, position_ids, sequence_lengths = [], [], [], []
+        for ids in tokenized[members]["input_ids"]:
+            ids = ids[:max_length]
+            input_ids.extend(ids)
+            labels.extend([IGNORE_INDEX] + ids[1:])
+            position_ids.extend(range(len(ids)))
+            sequence_lengths.append(len(ids))
+        yield {"input_ids": input_ids, "labels": labels, "position_ids": position_ids,
+               "sequence_lengths": sequence_lengths}
+
+
+def padding_report(lengths, bins, max_length=DEFAULT_MAX_LENGTH):
+    tokens = sum(min(length, max_length) for length in lengths)
+    padded_slots = len(lengths) * max_length
+    packed_slots = len(bins) * max_length
+    return {
+        "examples": len(lengths),
+        "tokens": tokens,
+        "rows_before": len(lengths),
+        "rows_after": len(bins),
+        "padding_before": 1 - tokens / padded_slots if padded_slots else 0.0,
+        "padding_after": 1 - tokens / packed_slots if packed_slots else 0.0,
+    }
+
+
+def prepare_packed_dataset(dataset, tokenizer, max_length=DEFAULT_MAX_LENGTH, num_proc=None,
+                           cache_dir=PACKED_DATASET_DIR):
+    # dataset: raw ruslanmv/ai-medical-chatbot split (Description/Patient/Doctor).
+    # Returns (packed Dataset, padding report); later calls with the same inputs load from disk.
+    from datasets import Dataset, load_from_disk
+    path = os.path.join(cache_dir, cache_key(dataset, tokenizer, max_length))
+    report_path = os.path.join(path, "padding_report.json")
+    if os.path.exists(report_path):
+        with open(report_path) as f:
+            return load_from_disk(path), {**json.load(f), "cached": True}
+
+    tokenized = tokenize_prompts(add_prompts(dataset, num_proc), tokenizer, max_length, num_proc)
+    lengths = tokenized["length"]
+    bins = pack_lengths(lengths, max_length)
+    packed = Dataset.from_generator(packed_rows, gen_kwargs={"tokenized": tokenized, "bins": bins,
+                                                             "max_length": max_length})
+    report = padding_report(lengths, bins, max_length)
+    packed.save_to_disk(path)
+    # Written last: its presence marks a complete cache entry
+    with open(report_path, "w") as f:
+        json.dump(report, f)
+    return load_from_disk(path), {**report, "cached": False}
+
+
+class PackedCollator:
+    # Pads packed rows to the longest in the batch and builds a block-diagonal causal mask, so tokens
+    # only attend within their own conversation. With block_diagonal=False only position_ids are
+    # returned, for attention implementations that derive boundaries from them (flash_attention_2).
+    def __init__(self, tokenizer, block_diagonal=True):
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.block_diagonal = block_diagonal
+
+    def __call__(self, features):
+        import torch
+        length = max(len(feature["input_ids"]) for feature in features)
+        batch_size = len(features)
+        input_ids = torch.full((batch_size, length), self.pad_token_id, dtype=torch.long)
+        labels = torch.full((batch_size, length), IGNORE_INDEX, dtype=torch.long)
+        position_ids = torch.zeros((batch_size, length), dtype=torch.long)
+        segments = torch.full((batch_size, length), -1, dtype=torch.long)
+        for row, feature in enumerate(features):
+            n = len(feature["input_ids"])
+            input_ids[row, :n] = torch.tensor(feature["input_ids"])
+            labels[row, :n] = torch.tensor(feature["labels"])
+            position_ids[row, :n] = torch.tensor(feature["position_ids"])
+            segments[row, :n] = torch.repeat_interleave(torch.arange(len(feature["sequence_lengths"])),
+                                                        torch.tensor(feature["sequence_lengths"]))
+        batch = {"input_ids": input_ids, "labels": labels, "position_ids": position_ids}
+        if not self.block_diagonal:
+            return batch
+        causal = torch.tril(torch.ones((length, length), dtype=torch.bool))
+        same_segment = (segments[:, :, None] == segments[:, None, :]) & (segments[:, :, None] >= 0)
+        allowed = same_segment & causal
+        # Fully padded query rows still need one visible key to avoid NaNs in the softmax
+        allowed |= torch.eye(length, dtype=torch.bool)
+        mask = torch.zeros((batch_size, 1, length, length), dtype=torch.float32)
+        batch["attention_mask"] = mask.masked_fill(~allowed[:, None], torch.finfo(torch.float32).min)
+        return batch
+
+
+def main():
+    # python packing_pipeline.py --tokenizer google/gemma-2-2b-it --num-proc 8
+    parser = argparse.ArgumentParser(description="Pack ai-medical-chatbot conversations into fixed-length rows.")
+    parser.add_argument("--tokenizer", default="google/gemma-2-2b-it")
+    parser.add_argument("--dataset", default="ruslanmv/ai-medical-chatbot")
+    parser.add_argument("--limit", type=int, default=None, help="only use the first N training examples")
+    parser.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH)
+    parser.add_argument("--num-proc", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    from datasets import load_dataset
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    dataset = load_dataset(args.dataset, split="train")
+    if args.limit:
+        dataset = dataset.select(range(min(args.limit, len(dataset))))
+
+    packed, report = prepare_packed_dataset(dataset, tokenizer, args.max_length, args.num_proc)
+    print(f"{report['examples']} conversations, {report['tokens']} tokens"
+          f"{' (loaded from cache)' if report['cached'] else ''}")
+    print(f"padded to {args.max_length}: {report['rows_before']} rows, {100 * report['padding_before']:.1f}% padding")
+    print(f"packed:        {report['rows_after']} rows, {100 * report['padding_after']:.1f}% padding")
+    print(packed)
+
+
+if __name__ == "__main__":
+    main()
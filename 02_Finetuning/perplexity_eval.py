@@ -0,0 +1,179 @@
+import argparse
+import json
+import math
+import time
+
+import torch
+import torch.nn.functional as F
+
+from prompt_template import generate_prompt, response_start
+
+# Batched perplexity evaluation for the base and fine-tuned Gemma models.
+# Replaces the per-example loop in the notebook's calculate_perplexity:
+#   - every text is tokenized once, in one batched call
+#   - examples are grouped into length buckets so batches carry little padding
+#   - each batch is one forward pass with an attention mask
+#   - only answer tokens are scored; prompt and padding positions get label -100
+#   - loss and token counts stay on the device and are read back once at the end
+# Runs on CPU with a tiny model, e.g. python perplexity_eval.py --model sshleifer/tiny-gpt2 --limit 64
+
+IGNORE_INDEX = -100
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_MAX_LENGTH = 1024
+# Upper bound on padded tokens per batch; long buckets get smaller batches
+DEFAULT_MAX_BATCH_TOKENS = 16384
+
+
+def tokenize(texts, tokenizer, max_length=DEFAULT_MAX_LENGTH, mask_prompt=True):
+    # Returns [(input_ids, number of leading prompt tokens)] for every text
+    starts = [response_start(text) if mask_prompt else 0 for text in texts]
+    if getattr(tokenizer, "is_fast", False):
+        encoded = tokenizer(texts, truncation=True, max_length=max_length, return_offsets_mapping=True)
+        examples = []
+        for ids, offsets, start in zip(encoded["input_ids"], encoded["offset_mapping"], starts):
+            # Leading run of tokens that end before the answer (a BOS token has offsets (0, 0))
+            prompt_tokens = 0
+            for _, end in offsets:
+                if end > start:
+                    break
+                prompt_tokens += 1
+            examples.append((ids, prompt_tokens))
+        return examples
+    encoded = tokenizer(texts, truncation=True, max_length=max_length)["input_ids"]
+    prefixes = tokenizer([text[:start] for text, start in zip(texts, starts)], truncation=True,
+                         max_length=max_length)["input_ids"]
+    return [(ids, min(len(prefix), len(ids)) if start else 0) for ids, prefix, start in zip(encoded, prefixes, starts)]
+
+
+def length_buckets(lengths, batch_size=DEFAULT_BATCH_SIZE, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+    # Indices sorted by length and cut into batches bounded by count and padded tokens
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    batches, current = [], []
+    for i in order:
+        # Sorted ascending, so the newest example sets the padded length of the batch
+        if current and (len(current) == batch_size or (len(current) + 1) * lengths[i] > max_batch_tokens):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def collate(examples, pad_token_id):
+    # Right-padded input_ids / attention_mask / labels for one bucket
+    length = max(len(ids) for ids, _ in examples)
+    input_ids = torch.full((len(examples), length), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(examples), length), dtype=torch.long)
+    labels = torch.full((len(examples), length), IGNORE_INDEX, dtype=torch.long)
+    for row, (ids, prompt_tokens) in enumerate(examples):
+        ids = torch.tensor(ids, dtype=torch.long)
+        input_ids[row, :len(ids)] = ids
+        attention_mask[row, :len(ids)] = 1
+        labels[row, prompt_tokens:len(ids)] = ids[prompt_tokens:]
+    return input_ids, attention_mask, labels
+
+
+def evaluate_perplexity(model, tokenizer, texts, batch_size=DEFAULT_BATCH_SIZE, max_length=DEFAULT_MAX_LENGTH,
+                        max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, mask_prompt=True, device=None):
+    device = device or next(model.parameters()).device
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+    start = time.perf_counter()
+    examples = tokenize(texts, tokenizer, max_length, mask_prompt)
+    tokenize_seconds = time.perf_counter() - start
+    batches = length_buckets([len(ids) for ids, _ in examples], batch_size, max_batch_tokens)
+
+    model.eval()
+    total_nll = torch.zeros((), dtype=torch.float64, device=device)
+    scored_tokens = torch.zeros((), dtype=torch.long, device=device)
+    processed_tokens = 0
+    with torch.inference_mode():
+        for batch in batches:
+            input_ids, attention_mask, labels = (tensor.to(device, non_blocking=True)
+                                                 for tensor in collate([examples[i] for i in batch], pad_token_id))
+            logits = model(input_ids=input_ids, attention_mask=attention_mask).logits
+            # Position t predicts token t + 1
+            shift_logits = logits[:, :-1].float()
+            shift_labels = labels[:, 1:]
+            total_nll += F.cross_entropy(shift_logits.reshape(-1, shift_logits.size(-1)), shift_labels.reshape(-1),
+                                         ignore_index=IGNORE_INDEX, reduction="sum").double()
+            scored_tokens += (shift_labels != IGNORE_INDEX).sum()
+            processed_tokens += sum(len(examples[i][0]) for i in batch)
+
+    # The only device-to-host sync
+    nll, tokens = total_nll.item(), scored_tokens.item()
+    seconds = time.perf_counter() - start
+    return {
+        "perplexity": math.exp(nll / tokens) if tokens else float("nan"),
+        "mean_nll": nll / tokens if tokens else float("nan"),
+        "examples": len(texts),
+        "batches": len(batches),
+        "scored_tokens": tokens,
+        "processed_tokens": processed_tokens,
+        "seconds": seconds,
+        "tokenize_seconds": tokenize_seconds,
+        "tokens_per_second": processed_tokens / seconds if seconds else float("nan"),
+    }
+
+
+def per_example_perplexity(model, tokenizer, texts, device=None):
+    # The notebook's original loop (full-sequence loss, one example per step), kept for timing comparisons
+    device = device or next(model.parameters()).device
+    total_loss, total_tokens = 0.0, 0
+    start = time.perf_counter()
+    with torch.no_grad():
+        for text in texts:
+            inputs = tokenizer(text, return_tensors="pt").to(device)
+            loss = model(**inputs, labels=inputs.input_ids).loss
+            total_loss += loss.item() * inputs.input_ids.size(1)
+            total_tokens += inputs.input_ids.size(1)
+    seconds = time.perf_counter() - start
+    return {"perplexity": math.exp(total_loss / total_tokens), "processed_tokens": total_tokens,
+            "seconds": seconds, "tokens_per_second": total_tokens / seconds}
+
+
+def load_texts(args):
+    if args.jsonl:
+        with open(args.jsonl) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        texts = [record["prompt"] if "prompt" in record else generate_prompt(record) for record in records]
+    else:
+        from datasets import load_dataset
+        dataset = load_dataset(args.dataset, split="train").shuffle(seed=1234)
+        dataset = dataset.select(range(min(args.limit, len(dataset))))
+        texts = [generate_prompt(data_point) for data_point in dataset]
+    return texts[:args.limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched answer-only perplexity of a causal LM.")
+    parser.add_argument("--model", default="sshleifer/tiny-gpt2", help="model id or local path")
+    parser.add_argument("--dataset", default="ruslanmv/ai-medical-chatbot")
+    parser.add_argument("--jsonl", help="records with a 'prompt' field, or Description/Patient/Doctor fields")
+    parser.add_argument("--limit", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-length", type=int, default=DEFAULT_MAX_LENGTH)
+    parser.add_argument("--max-batch-tokens", type=int, default=DEFAULT_MAX_BATCH_TOKENS)
+    parser.add_argument("--full-sequence", action="store_true", help="also score prompt tokens")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--baseline", action="store_true", help="also time the notebook's per-example loop")
+    args = parser.parse_args()
+
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model).to(args.device)
+    texts = load_texts(args)
+
+    result = evaluate_perplexity(model, tokenizer, texts, args.batch_size, args.max_length, args.max_batch_tokens,
+                                 mask_prompt=not args.full_sequence, device=args.device)
+    print(f"batched: perplexity {result['perplexity']:.3f} over {result['scored_tokens']} answer tokens, "
+          f"{result['examples']} examples in {result['batches']} batches, {result['seconds']:.2f}s "
+          f"({result['tokens_per_second']:.0f} tokens/sec)")
+    if args.baseline:
+        baseline = per_example_perplexity(model, tokenizer, texts, device=args.device)
+        print(f"per-example (full sequence): perplexity {baseline['perplexity']:.3f}, {baseline['seconds']:.2f}s "
+              f"({baseline['tokens_per_second']:.0f} tokens/sec)")
+
+
+if __name__ == "__main__":
+    main()
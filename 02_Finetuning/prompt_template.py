@@ -0,0 +1,33 @@
+import hashlib
+import inspect
+
+# Gemma chat template used to fine-tune on ruslanmv/ai-medical-chatbot (same as generate_prompt in
+# AIMedical_Finetuning_Gemma2_2B_it.ipynb). Everything up to and including RESPONSE_MARKER is the
+# prompt; the doctor's answer after it is what the model is trained and evaluated on.
+
+RESPONSE_MARKER = "<start_of_turn>model"
+
+
+def generate_prompt(data_point):
+    # Generate prompt
+    prefix_text = 'Below is an instruction that describes a task. Write a response that ' \
+                  'appropriately completes the request.\n\n'
+
+    # Samples with additional context info
+    if data_point['Patient']:
+        text = f"""<start_of_turn>user {prefix_text} {data_point["Description"]} here are the inputs {data_point["Patient"]} <end_of_turn>\n<start_of_turn>model{data_point["Doctor"]} <end_of_turn>"""
+    # Without additional context info
+    else:
+        text = f"""<start_of_turn>user {prefix_text} {data_point["Description"]} <end_of_turn>\n<start_of_turn>model{data_point["Doctor"]} <end_of_turn>"""
+    return text
+
+
+def response_start(text):
+    # Character offset where the model's answer begins (0 when the marker is missing)
+    position = text.find(RESPONSE_MARKER)
+    return position + len(RESPONSE_MARKER) if position != -1 else 0
+
+
+def template_hash():
+    # Changes whenever the template code changes, so cached tokenizations are not reused
+    return hashlib.sha256(inspect.getsource(generate_prompt).encode("utf-8")).hexdigest()[:16]
@@ -3,6 +3,7 @@ import openai
 import numpy as np
 import pandas as pd
 import json
+import time
 from langchain.chat_models import ChatOpenAI
 from langchain.document_loaders import CSVLoader
 from langchain.embeddings import OpenAIEmbeddings
@@ -15,6 +16,9 @@ import streamlit as st
 import warnings
 from streamlit_option_menu import option_menu
 from streamlit_extras.mention import mention
+from summarizer import MODEL, PROMPT_VERSION, stream_summary, summarize_article
+from summary_cache import get_summary_cache
+from batch_summarizer import DEFAULT_MAX_WORKERS, parse_articles, summarize_many
 
 warnings.filterwarnings("ignore")
 
@@ -78,57 +82,81 @@ elif options == "About Me":
 
 elif options == "Model":
     st.title('News Summarizer Tool')
-    col1, col2, col3 = st.columns([1, 2, 1])
-
-    with col2:
-        News_Article = st.text_input("News Article", placeholder="News : ")
-        submit_button = st.button("Generate Summary")
-
-    if submit_button:
-        with st.spinner("Generating Summary"):
-            System_Prompt = """
-Role: Act as an objective news summarizer. Your task is to distill news articles into brief, informative summaries that convey essential details while maintaining complete neutrality and accuracy.
-Goal: Provide summaries that are comprehensive enough for readers to understand the main points and context of the article, but concise enough to be easily digestible.
-Instructions for Summarizing News Articles:
-Identify Core Information:
-Break down the article to capture the “5Ws and H”:
-Who: Identify the primary individuals, groups, or organizations at the heart of the article.
-What: Clarify the main event, action, or topic.
-When: State any relevant timeframes or dates, especially if they provide important context.
-Where: Include specific locations, regions, or relevant geographies.
-Why: Mention any reasons or motivations provided for the event or action, focusing on factual explanations rather than speculation.
-How: Briefly explain how the event unfolded, including methods or steps taken if detailed.
-Prioritize Key Quotes and Statements:
-Select only the most critical quotes or statements from the article, specifically those that:
-Illustrate the perspective of a major party involved.
-Convey the article's main findings or conclusions.
-Paraphrase when possible to maintain brevity, while preserving the meaning.
-Background and Context:
-Include any essential background or context that will help the reader understand the significance of the article.
-This might involve:
-Relevant historical events.
-Previous or related news that links to the current story.
-General trends or patterns that add depth to the event.
-Outline Results and Implications:
-Identify any direct outcomes, potential impacts, or broader implications, particularly those affecting:
-Public policy, economic trends, or social issues.
-Relevant industries, communities, or demographics.
-Mention likely future developments if covered in the article, to give readers an understanding of ongoing or unresolved issues.
-Write with Clarity, Conciseness, and Neutrality:
-Use clear, precise language to summarize points.
-Avoid any form of subjective or speculative language unless directly quoted or stated in the article.
-Stay neutral, reporting only on the information provided without adding opinion, bias, or personal interpretations.
-Structure for Maximum Impact:
-Single-Sentence Headline Summary: Start with one sentence that conveys the main idea or takeaway from the article.
-Expanded Summary: Follow up with a 2-4 sentence detailed summary covering the specific elements mentioned (i.e., key events, context, quotes, results).
-"""
-            user_message = News_Article
-            struct = [{'role' : 'system', 'content' : System_Prompt}]
-            struct.append({"role": "user", "content": user_message})
-            chat = openai.ChatCompletion.create(model="gpt-4o-mini", messages = struct)
-            response = chat.choices[0].message.content
-            struct.append({"role": "assistant", "content": response})
-            st.success("Insight generated successfully!")
-            st.subheader("Summary : ")
-            st.write(response)
-            
+    mode = st.radio("Mode", ["Single article", "Batch"], horizontal=True)
+    use_cache = st.checkbox("Reuse cached summaries (including near-duplicate articles)", value=True)
+    summary_cache = get_summary_cache()
+
+    def summarize(article):
+        if not use_cache:
+            return summarize_article(article)
+        return summary_cache.get_or_summarize(article, MODEL, PROMPT_VERSION, summarize_article)
+
+    if mode == "Single article":
+        col1, col2, col3 = st.columns([1, 2, 1])
+
+        with col2:
+            News_Article = st.text_input("News Article", placeholder="News : ")
+            submit_button = st.button("Generate Summary")
+
+        if submit_button:
+            start = time.perf_counter()
+            cached_response, match = summary_cache.get(News_Article, MODEL, PROMPT_VERSION) if use_cache else (None, None)
+            if cached_response is not None:
+                st.subheader("Summary : ")
+                st.write(cached_response)
+                st.caption(f"Served from cache ({match} match) in {1000 * (time.perf_counter() - start):.0f} ms")
+            else:
+                # Tokens are rendered as they arrive instead of waiting for the full completion
+                metrics = {}
+                st.subheader("Summary : ")
+                response = st.write_stream(stream_summary(News_Article, metrics=metrics))
+                if use_cache:
+                    summary_cache.put(News_Article, MODEL, PROMPT_VERSION, response)
+                st.success("Insight generated successfully!")
+                st.caption(f"Time to first token: {1000 * metrics.get('time_to_first_token', 0):.0f} ms · "
+                           f"total: {metrics.get('total_seconds', 0):.2f} s")
+
+    else:
+        source = st.selectbox("Articles input", ["Paste articles", "Upload CSV", "Upload JSONL"])
+        if source == "Paste articles":
+            raw_articles = st.text_area("News Articles (separate articles with a blank line)", height=300)
+            input_format = "text"
+        else:
+            input_format = "csv" if source == "Upload CSV" else "jsonl"
+            uploaded_file = st.file_uploader("Upload articles (an 'article' or 'text' column/field)", type=[input_format])
+            raw_articles = uploaded_file.getvalue() if uploaded_file is not None else ""
+        max_workers = st.slider("Concurrent requests", min_value=1, max_value=32, value=DEFAULT_MAX_WORKERS)
+        submit_button = st.button("Generate Summaries")
+
+        if submit_button:
+            try:
+                articles = parse_articles(raw_articles, input_format)
+            except ValueError as e:
+                st.error(str(e))
+                articles = []
+            if not articles:
+                st.warning("Please provide at least one article.")
+            else:
+                progress_bar = st.progress(0.0)
+                # One placeholder per article so summaries appear in input order as they complete
+                slots = [st.empty() for _ in articles]
+                start = time.perf_counter()
+                for done, (index, summary, error, seconds) in enumerate(summarize_many(articles, max_workers, summarize), start=1):
+                    with slots[index].container():
+                        st.subheader(f"Article {index + 1}")
+                        st.caption(articles[index][:200])
+                        if error is not None:
+                            st.error(f"Failed after {seconds:.1f}s: {error}")
+                        else:
+                            st.write(summary)
+                            st.caption(f"Summarized in {seconds:.1f}s")
+                    progress_bar.progress(done / len(articles))
+                st.success(f"Summarized {len(articles)} articles in {time.perf_counter() - start:.1f}s")
+
+    stats = summary_cache.stats()
+    with st.sidebar.expander("Summary cache"):
+        st.write(f"Exact hits: {stats['exact_hits']}")
+        st.write(f"Near-duplicate hits: {stats['near_hits']}")
+        st.write(f"Misses: {stats['misses']}")
+        st.write(f"Hit rate: {stats['hit_rate']:.1%}")
+        st.write(f"Cached summaries: {stats['entries']}")
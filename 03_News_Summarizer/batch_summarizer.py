@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from summarizer import summarize_article
+
+# Batch mode: many articles summarized concurrently through a bounded thread pool.
+# Summaries are yielded as each request completes, not in submission order.
+
+DEFAULT_MAX_WORKERS = 8
+ARTICLE_FIELDS = ("article", "text", "content", "News_Article")
+
+
+def split_pasted_articles(text):
+    # Articles pasted into the text area are separated by blank lines
+    articles, current = [], []
+    for line in text.splitlines():
+        if line.strip():
+            current.append(line.strip())
+        elif current:
+            articles.append(" ".join(current))
+            current = []
+    if current:
+        articles.append(" ".join(current))
+    return articles
+
+
+def article_from_record(record):
+    if not isinstance(record, dict):
+        raise ValueError(f"Each record must be an object, got {type(record).__name__}")
+    for field in ARTICLE_FIELDS:
+        if record.get(field):
+            return str(record[field])
+    raise ValueError(f"Each record needs one of these fields: {', '.join(ARTICLE_FIELDS)}")
+
+
+def parse_articles(data, input_format="text"):
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    if input_format == "csv":
+        return [article_from_record(row) for row in csv.DictReader(io.StringIO(data))]
+    if input_format == "jsonl":
+        articles = []
+        for number, line in enumerate(data.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                articles.append(article_from_record(json.loads(line)))
+            except ValueError as e:
+                raise ValueError(f"Line {number}: {e}") from e
+        return articles
+    return split_pasted_articles(data)
+
+
+def summarize_many(articles, max_workers=DEFAULT_MAX_WORKERS, summarize=summarize_article):
+    # Yields (index, summary, error, seconds) for each article as soon as it finishes
+    def run(index, article):
+        start = time.perf_counter()
+        try:
+            return index, summarize(article), None, time.perf_counter() - start
+        except Exception as e:
+            return index, None, e, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run, index, article) for index, article in enumerate(articles)]
+        for future in as_completed(futures):
+            yield future.result()
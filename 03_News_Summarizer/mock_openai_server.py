@@ -0,0 +1,161 @@
+import argparse
+import hashlib
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Minimal OpenAI-compatible server for exercising the summarizer offline.
+#
+#   python mock_openai_server.py --port 8000 --delay 0.5 --rate-limit-every 5
+#   OPENAI_API_BASE=http://127.0.0.1:8000/v1 streamlit run app.py
+#
+# Any API key is accepted. Every Nth request gets a 429 with Retry-After so the backoff can be observed.
+# Chat requests with "stream": true are answered as server-sent events, one word per chunk,
+# and /v1/embeddings returns deterministic hash-based vectors.
+
+EMBEDDING_DIM = 1536
+
+MOCK_SUMMARY = ("Mock headline summarizing the article. "
+                "This is a canned expanded summary returned by the local mock server. "
+                "It echoes the first words of the article: {excerpt}")
+
+
+class MockState:
+    def __init__(self, delay=0.0, rate_limit_every=0, token_delay=0.02):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.rate_limit_every = rate_limit_every
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def next_request(self):
+        with self.lock:
+            return next(self.counter)
+
+
+def completion_text(messages):
+    user_messages = [m["content"] for m in messages if m.get("role") == "user"]
+    excerpt = " ".join(user_messages[-1].split()[:12]) if user_messages else ""
+    return MOCK_SUMMARY.format(excerpt=excerpt)
+
+
+def mock_embedding(text, dim=EMBEDDING_DIM):
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    seed = int.from_bytes(digest[:8], "big")
+    values = []
+    for _ in range(dim):
+        seed = (seed * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        values.append((seed >> 11) / float(1 << 53) * 2 - 1)
+    norm = sum(v * v for v in values) ** 0.5
+    return [v / norm for v in values]
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            number = state.next_request()
+
+            if state.rate_limit_every and number % state.rate_limit_every == 0:
+                self.send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                               headers={"Retry-After": "1"})
+                return
+
+            if self.path.endswith("/embeddings"):
+                inputs = request.get("input", [])
+                inputs = [inputs] if isinstance(inputs, str) else inputs
+                time.sleep(state.delay)
+                self.send_json(200, {
+                    "object": "list",
+                    "model": request.get("model", "mock"),
+                    "data": [{"object": "embedding", "index": i, "embedding": mock_embedding(text)}
+                             for i, text in enumerate(inputs)],
+                    "usage": {"prompt_tokens": sum(len(t.split()) for t in inputs),
+                              "total_tokens": sum(len(t.split()) for t in inputs)},
+                })
+                return
+
+            if not self.path.endswith("/chat/completions"):
+                self.send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+                return
+
+            time.sleep(state.delay)
+            content = completion_text(request.get("messages", []))
+            if request.get("stream"):
+                self.send_stream(number, request.get("model", "mock"), content)
+                return
+            prompt_tokens = sum(len(m.get("content", "").split()) for m in request.get("messages", []))
+            self.send_json(200, {
+                "id": f"chatcmpl-mock-{number}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content.split()),
+                          "total_tokens": prompt_tokens + len(content.split())},
+            })
+
+        def send_stream(self, number, model, content):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            words = content.split(" ")
+            deltas = [{"role": "assistant", "content": ""}] + [
+                {"content": word if i == 0 else " " + word} for i, word in enumerate(words)]
+            for i, delta in enumerate(deltas + [{}]):
+                chunk = {
+                    "id": f"chatcmpl-mock-{number}",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if i == len(deltas) else None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(state.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8000, delay=0.0, rate_limit_every=0, token_delay=0.02):
+    server = ThreadingHTTPServer((host, port), make_handler(MockState(delay, rate_limit_every, token_delay)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock OpenAI-compatible server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait before each response")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="answer every Nth request with a 429")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 make_handler(MockState(args.delay, args.rate_limit_every, args.token_delay)))
+    print(f"Mock OpenAI server listening on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
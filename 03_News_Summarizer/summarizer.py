@@ -0,0 +1,199 @@
+import hashlib
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+import tiktoken
+
+# Summarization calls shared by the single-article and batch modes of the Model page.
+# Set OPENAI_API_BASE (e.g. http://127.0.0.1:8000/v1 for mock_openai_server.py) to point
+# the client at any OpenAI-compatible server.
+
+MODEL = "gpt-4o-mini"
+MAX_RETRIES = 6
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+# Articles longer than this take the map-reduce path: overlapping chunks are summarized in
+# parallel, then the partial summaries are merged into the usual headline + expanded summary.
+LONG_ARTICLE_TOKENS = 6000
+CHUNK_TOKENS = 3000
+CHUNK_OVERLAP_TOKENS = 200
+MAP_WORKERS = 4
+
+System_Prompt = """
+Role: Act as an objective news summarizer. Your task is to distill news articles into brief, informative summaries that convey essential details while maintaining complete neutrality and accuracy.
+Goal: Provide summaries that are comprehensive enough for readers to understand the main points and context of the article, but concise enough to be easily digestible.
+Instructions for Summarizing News Articles:
+Identify Core Information:
+Break down the article to capture the “5Ws and H”:
+Who: Identify the primary individuals, groups, or organizations at the heart of the article.
+What: Clarify the main event, action, or topic.
+When: State any relevant timeframes or dates, especially if they provide important context.
+Where: Include specific locations, regions, or relevant geographies.
+Why: Mention any reasons or motivations provided for the event or action, focusing on factual explanations rather than speculation.
+How: Briefly explain how the event unfolded, including methods or steps taken if detailed.
+Prioritize Key Quotes and Statements:
+Select only the most critical quotes or statements from the article, specifically those that:
+Illustrate the perspective of a major party involved.
+Convey the article's main findings or conclusions.
+Paraphrase when possible to maintain brevity, while preserving the meaning.
+Background and Context:
+Include any essential background or context that will help the reader understand the significance of the article.
+This might involve:
+Relevant historical events.
+Previous or related news that links to the current story.
+General trends or patterns that add depth to the event.
+Outline Results and Implications:
+Identify any direct outcomes, potential impacts, or broader implications, particularly those affecting:
+Public policy, economic trends, or social issues.
+Relevant industries, communities, or demographics.
+Mention likely future developments if covered in the article, to give readers an understanding of ongoing or unresolved issues.
+Write with Clarity, Conciseness, and Neutrality:
+Use clear, precise language to summarize points.
+Avoid any form of subjective or speculative language unless directly quoted or stated in the article.
+Stay neutral, reporting only on the information provided without adding opinion, bias, or personal interpretations.
+Structure for Maximum Impact:
+Single-Sentence Headline Summary: Start with one sentence that conveys the main idea or takeaway from the article.
+Expanded Summary: Follow up with a 2-4 sentence detailed summary covering the specific elements mentioned (i.e., key events, context, quotes, results).
+"""
+
+Chunk_Prompt = """
+You are reading part {part} of {parts} of a longer news article. Summarize only this part.
+Capture the 5Ws and H (who, what, when, where, why, how) it contains, the most important quotes or statements (paraphrased),
+any background or context, and any results or implications. Keep names, numbers and dates exact.
+Do not write a headline; write 3-6 factual sentences. Do not speculate about parts you have not seen.
+"""
+
+Merge_Prompt = """
+The following are partial summaries of consecutive parts of one news article, in order.
+Merge them into a single summary of the whole article following your instructions:
+a single-sentence headline summary, followed by a 2-4 sentence expanded summary.
+Remove repetition caused by overlapping parts.
+
+{partials}
+"""
+
+# Part of the summary cache key: editing any prompt invalidates previously cached summaries
+PROMPT_VERSION = hashlib.sha256((System_Prompt + Chunk_Prompt + Merge_Prompt).encode("utf-8")).hexdigest()[:12]
+
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIError,  # generic 5xx responses, usually transient
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+
+def retry_after(error):
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def with_backoff(call, max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    # Exponential backoff with full jitter; a server-provided Retry-After wins when present
+    for attempt in range(max_retries + 1):
+        try:
+            return call()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            time.sleep(delay)
+
+
+def chat_completion(messages, model=MODEL, **kwargs):
+    chat = with_backoff(lambda: openai.ChatCompletion.create(model=model, messages=messages, **kwargs))
+    return chat.choices[0].message.content
+
+
+def stream_chat_completion(messages, model=MODEL, metrics=None, **kwargs):
+    # Yields content deltas as they arrive; fills metrics with time to first token and total latency
+    metrics = metrics if metrics is not None else {}
+    start = time.perf_counter()
+    response = with_backoff(lambda: openai.ChatCompletion.create(model=model, messages=messages, stream=True, **kwargs))
+    for chunk in response:
+        if not chunk["choices"]:
+            continue
+        delta = chunk["choices"][0]["delta"].get("content")
+        if delta:
+            metrics.setdefault("time_to_first_token", time.perf_counter() - start)
+            yield delta
+    metrics["total_seconds"] = time.perf_counter() - start
+
+
+def get_encoding(model=MODEL):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Older tiktoken releases do not know the gpt-4o family yet
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text, model=MODEL):
+    return len(get_encoding(model).encode(text))
+
+
+def split_into_chunks(text, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS, model=MODEL):
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text)
+    step = chunk_tokens - overlap_tokens
+    chunks = []
+    for start in range(0, len(tokens), step):
+        chunks.append(encoding.decode(tokens[start:start + chunk_tokens]))
+        if start + chunk_tokens >= len(tokens):
+            break
+    return chunks
+
+
+def summarize_chunk(chunk, part, parts, model=MODEL):
+    struct = [{'role': 'system', 'content': System_Prompt + Chunk_Prompt.format(part=part, parts=parts)}]
+    struct.append({"role": "user", "content": chunk})
+    return chat_completion(struct, model=model)
+
+
+def merge_messages(partials):
+    numbered = "\n\n".join(f"Part {i}: {partial}" for i, partial in enumerate(partials, start=1))
+    struct = [{'role': 'system', 'content': System_Prompt}]
+    struct.append({"role": "user", "content": Merge_Prompt.format(partials=numbered)})
+    return struct
+
+
+def summarize_partials(article, model=MODEL, max_workers=MAP_WORKERS):
+    chunks = split_into_chunks(article, model=model)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda args: summarize_chunk(args[1], args[0], len(chunks), model),
+                                 enumerate(chunks, start=1)))
+
+
+def summarize_long_article(article, model=MODEL, max_workers=MAP_WORKERS):
+    return chat_completion(merge_messages(summarize_partials(article, model, max_workers)), model=model)
+
+
+def summary_messages(article):
+    struct = [{'role': 'system', 'content': System_Prompt}]
+    struct.append({"role": "user", "content": article})
+    return struct
+
+
+def summarize_article(article, model=MODEL):
+    if count_tokens(article, model) > LONG_ARTICLE_TOKENS:
+        return summarize_long_article(article, model=model)
+    return chat_completion(summary_messages(article), model=model)
+
+
+def stream_summary(article, model=MODEL, metrics=None):
+    # Long articles run the map step first, then stream the merge pass
+    if count_tokens(article, model) > LONG_ARTICLE_TOKENS:
+        messages = merge_messages(summarize_partials(article, model))
+    else:
+        messages = summary_messages(article)
+    yield from stream_chat_completion(messages, model=model, metrics=metrics)
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+
+# Local cache of article summaries.
+# Exact layer: key = hash(model, prompt version, normalized article text).
+# Near-duplicate layer: a MinHash signature over word shingles estimates the Jaccard similarity
+# of two articles, so lightly edited copies of a syndicated story map to the stored summary.
+# Candidates are found by LSH: the signature is cut into BANDS bands of ROWS_PER_BAND values and
+# any stored article sharing one band is compared; a match needs an estimated similarity of at
+# least MIN_SIMILARITY. With 32 bands of 4, pairs at similarity 0.8 become candidates with
+# probability > 0.9999, pairs at 0.3 about 23% of the time (and are then rejected by the estimate).
+
+DEFAULT_CACHE_PATH = os.environ.get(
+    "SUMMARY_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".summary_cache.sqlite3"))
+DEFAULT_TTL_SECONDS = int(os.environ.get("SUMMARY_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("SUMMARY_CACHE_MAX_ENTRIES", "50000"))
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+MIN_SIMILARITY = float(os.environ.get("SUMMARY_CACHE_MIN_SIMILARITY", "0.8"))
+# Bump when the stored fingerprint format changes; older cache files are rebuilt
+SCHEMA_VERSION = 2
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: signatures must be comparable across processes and restarts
+_rng = random.Random(1234)
+PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+                for _ in range(NUM_PERMUTATIONS)]
+
+
+def normalize_article(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def exact_key(text, model, prompt_version):
+    payload = f"{model}\x00{prompt_version}\x00{normalize_article(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text):
+    # One 32-bit minimum per permutation h(x) = (a * x + b) mod p over the shingle hashes
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+              for shingle in shingles(text)]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH for a, b in PERMUTATIONS]
+
+
+def similarity(a, b):
+    # Fraction of equal MinHash values = unbiased estimate of the Jaccard similarity
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERMUTATIONS
+
+
+def bands(signature):
+    # One signed 64-bit value per band (SQLite INTEGER), hashed from its rows
+    values = []
+    for i in range(BANDS):
+        rows = struct.pack(f"<{ROWS_PER_BAND}I", *signature[i * ROWS_PER_BAND:(i + 1) * ROWS_PER_BAND])
+        values.append(int.from_bytes(hashlib.blake2b(rows, digest_size=8, person=bytes([i])).digest(), "big", signed=True))
+    return values
+
+
+def pack_signature(signature):
+    return struct.pack(f"<{NUM_PERMUTATIONS}I", *signature)
+
+
+def unpack_signature(blob):
+    return struct.unpack(f"<{NUM_PERMUTATIONS}I", blob)
+
+
+class SummaryCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # A cache: entries with the old fingerprints are simply dropped
+            self._conn.execute("DROP TABLE IF EXISTS summary_bands")
+            self._conn.execute("DROP TABLE IF EXISTS summaries")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, model TEXT, prompt_version TEXT, signature BLOB, "
+            "summary TEXT, created_at REAL, last_used REAL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summary_bands ("
+            "key TEXT REFERENCES summaries(key) ON DELETE CASCADE, band INTEGER, value INTEGER, "
+            "PRIMARY KEY (band, value, key))")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summary_bands_key ON summary_bands (key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self._conn.commit()
+
+    def get(self, article, model, prompt_version):
+        # Returns (summary, "exact" | "near") or (None, None)
+        now = time.time()
+        min_created = now - self.ttl_seconds
+        key = exact_key(article, model, prompt_version)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE key = ? AND created_at >= ?", (key, min_created)).fetchone()
+            if row is not None:
+                self._touch(key, now)
+                self.exact_hits += 1
+                return row[0], "exact"
+
+            signature = minhash(article)
+            where = " OR ".join("(b.band = ? AND b.value = ?)" for _ in range(BANDS))
+            candidates = self._conn.execute(
+                f"SELECT DISTINCT s.key, s.signature, s.summary FROM summary_bands b JOIN summaries s ON s.key = b.key "
+                f"WHERE s.model = ? AND s.prompt_version = ? AND s.created_at >= ? AND ({where})",
+                [model, prompt_version, min_created,
+                 *(v for band in enumerate(bands(signature)) for v in band)]).fetchall()
+            scored = [(similarity(signature, unpack_signature(blob)), key, summary) for key, blob, summary in candidates]
+            best = max(scored, default=None)
+            if best is not None and best[0] >= MIN_SIMILARITY:
+                self._touch(best[1], now)
+                self.near_hits += 1
+                return best[2], "near"
+
+            self.misses += 1
+            return None, None
+
+    def put(self, article, model, prompt_version, summary):
+        now = time.time()
+        signature = minhash(article)
+        key = exact_key(article, model, prompt_version)
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+            self._conn.execute(
+                "INSERT INTO summaries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, pack_signature(signature), summary, now, now))
+            self._conn.executemany("INSERT INTO summary_bands VALUES (?, ?, ?)",
+                                   [(key, band, value) for band, value in enumerate(bands(signature))])
+            self._evict(now)
+            self._conn.commit()
+
+    def _touch(self, key, now):
+        self._conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM summaries WHERE created_at < ?", (now - self.ttl_seconds,))
+        count = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM summaries WHERE key IN (SELECT key FROM summaries ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,))
+
+    def get_or_summarize(self, article, model, prompt_version, summarize):
+        summary, _ = self.get(article, model, prompt_version)
+        if summary is None:
+            summary = summarize(article)
+            self.put(article, model, prompt_version, summary)
+        return summary
+
+    def size(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def stats(self):
+        lookups = self.exact_hits + self.near_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.near_hits) / lookups if lookups else 0.0,
+            "entries": self.size(),
+        }
+
+
+_cache = None
+
+
+def get_summary_cache():
+    global _cache
+    if _cache is None:
+        _cache = SummaryCache()
+    return _cache
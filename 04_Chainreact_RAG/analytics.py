@@ -0,0 +1,211 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Structured query path for aggregate questions ("average transit time and cost for shipments
+# made by truck", "most expensive route", ...). Top-k retrieval only ever sees a couple of rows,
+# so these questions are answered with vectorized group-bys over the full typed table and the
+# computed numbers are handed to the LLM as context.
+
+COST_COLUMN = "Cost"
+TRANSIT_COLUMN = "Transit_Time (days)"
+MODE_COLUMN = "Mode_of_Transport"
+ORIGIN_COLUMN = "Origin"
+DESTINATION_COLUMN = "Destination"
+
+ID_COLUMN = "Shipment_ID"
+
+# Words that only make sense over many rows; enough on their own to take the aggregate path
+AGGREGATE_PATTERN = re.compile(
+    r"\b(average|avg|mean|median|total|sum|cheapest|costliest|most expensive|least expensive|fastest|slowest|"
+    r"compare|comparison|breakdown|overall|statistics|stats)\b", re.IGNORECASE)
+# Words that also fit single-shipment lookups ("how many days did T005 take?"); they only count
+# together with a grouping cue (by mode, per route, all shipments, ...)
+WEAK_AGGREGATE_PATTERN = re.compile(
+    r"\b(count|how many|number of|most|least|longest|shortest|highest|lowest|maximum|minimum|max|min|"
+    r"per|each|summary|summar\w*)\b", re.IGNORECASE)
+GROUPING_CUE = re.compile(r"\b(shipments|all|every|by|per|each|across)\b", re.IGNORECASE)
+# Capitalized name after a preposition ("to Mars", "from New York"), checked against the data's places
+PLACE_PATTERN = re.compile(r"\b(?i:from|to|into|in|at|via)\s+([A-Z][\w.]*(?:\s+[A-Z][\w.]*)*)")
+# Capitalized words after a preposition that are not places
+NOT_PLACES = {"usd", "us dollars", "dollars", "days"}
+
+GROUP_KEYWORDS = {
+    "route": re.compile(r"\broutes?\b|\blanes?\b", re.IGNORECASE),
+    MODE_COLUMN: re.compile(r"\b(modes?|by transport|each transport|transport types?)\b", re.IGNORECASE),
+    ORIGIN_COLUMN: re.compile(r"\b(origins?|by origin|source cit(y|ies))\b", re.IGNORECASE),
+    DESTINATION_COLUMN: re.compile(r"\b(destinations?|by destination)\b", re.IGNORECASE),
+}
+
+# (column, ascending) used to rank groups when the question asks for an extreme
+SORT_KEYWORDS = [
+    (re.compile(r"\b(cheapest|least expensive|lowest cost|least costly)\b", re.IGNORECASE), ("avg_cost_usd", True)),
+    (re.compile(r"\b(most expensive|costliest|highest cost|most costly|expensive)\b", re.IGNORECASE), ("avg_cost_usd", False)),
+    (re.compile(r"\b(fastest|quickest|shortest)\b", re.IGNORECASE), ("avg_transit_days", True)),
+    (re.compile(r"\b(slowest|longest)\b", re.IGNORECASE), ("avg_transit_days", False)),
+]
+
+AGGREGATIONS = {
+    "shipments": ("cost_usd", "size"),
+    "avg_cost_usd": ("cost_usd", "mean"),
+    "total_cost_usd": ("cost_usd", "sum"),
+    "min_cost_usd": ("cost_usd", "min"),
+    "max_cost_usd": ("cost_usd", "max"),
+    "avg_transit_days": ("transit_days", "mean"),
+    "min_transit_days": ("transit_days", "min"),
+    "max_transit_days": ("transit_days", "max"),
+    "avg_cost_per_day_usd": ("cost_per_day_usd", "mean"),
+}
+MAX_CONTEXT_ROWS = 25
+
+
+def parse_money(series):
+    # "$1,800 " -> 1800.0; anything unparseable becomes NaN
+    cleaned = series.astype(str).str.replace(r"[^0-9.\-]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").astype("float64")
+
+
+def prepare_table(dataframe):
+    table = dataframe.copy()
+    table.columns = [str(column).lstrip("\ufeff").strip() for column in table.columns]
+    table["cost_usd"] = parse_money(table[COST_COLUMN])
+    table["transit_days"] = pd.to_numeric(table[TRANSIT_COLUMN], errors="coerce").astype("float64")
+    table["cost_per_day_usd"] = table["cost_usd"] / table["transit_days"].replace(0, np.nan)
+    table["route"] = table[ORIGIN_COLUMN].astype(str) + " -> " + table[DESTINATION_COLUMN].astype(str)
+    return table
+
+
+def aggregate(table, group_by=None):
+    if group_by is None:
+        table = table.assign(scope="all shipments")
+        group_by = "scope"
+    result = table.groupby(group_by, sort=False).agg(**AGGREGATIONS).reset_index()
+    return result.round(2)
+
+
+def precompute_summaries(table):
+    # Per-mode / per-route / per-origin / per-destination tables, computed once per dataset
+    return {
+        "overall": aggregate(table),
+        MODE_COLUMN: aggregate(table, MODE_COLUMN),
+        "route": aggregate(table, "route"),
+        ORIGIN_COLUMN: aggregate(table, ORIGIN_COLUMN),
+        DESTINATION_COLUMN: aggregate(table, DESTINATION_COLUMN),
+    }
+
+
+def city_name(location):
+    return str(location).split(",")[0].strip()
+
+
+def mentions(question, value):
+    # Whole-word, case-insensitive match; also accepts a plural "s" ("trucks")
+    return re.search(rf"\b{re.escape(value)}s?\b", question, re.IGNORECASE) is not None
+
+
+def detect_filters(question, table):
+    filters = {}
+    modes = [mode for mode in table[MODE_COLUMN].dropna().unique() if mentions(question, str(mode))]
+    if modes:
+        filters[MODE_COLUMN] = modes
+    for column, preposition in ((ORIGIN_COLUMN, "from"), (DESTINATION_COLUMN, "to")):
+        values = [value for value in table[column].dropna().unique()
+                  if re.search(rf"\b{preposition}\s+{re.escape(city_name(value))}\b", question, re.IGNORECASE)]
+        if values:
+            filters[column] = values
+    if ORIGIN_COLUMN not in filters and DESTINATION_COLUMN not in filters:
+        # A city without "from"/"to" matches shipments in either direction
+        cities = {city_name(value) for value in pd.concat([table[ORIGIN_COLUMN], table[DESTINATION_COLUMN]]).dropna()}
+        mentioned = [city for city in cities if mentions(question, city)]
+        if mentioned:
+            filters["city"] = mentioned
+    return filters
+
+
+def unknown_places(question, table):
+    # Places named in the question that match no origin, destination or mode in the data
+    known = set(NOT_PLACES)
+    for value in pd.concat([table[ORIGIN_COLUMN], table[DESTINATION_COLUMN]]).dropna().unique():
+        known.add(str(value).lower())
+        known.update(part.strip().lower() for part in str(value).split(","))
+    known.update(str(mode).lower() for mode in table[MODE_COLUMN].dropna().unique())
+    return [place for place in PLACE_PATTERN.findall(question)
+            if not any(place.lower() == term or place.lower().startswith(term + " ") for term in known)]
+
+
+def names_shipment(question, table):
+    # Questions about one specific shipment need its row, not group-bys
+    if ID_COLUMN not in table.columns:
+        return False
+    return any(re.search(rf"\b{re.escape(str(value))}\b", question, re.IGNORECASE)
+               for value in table[ID_COLUMN].dropna().unique())
+
+
+def detect_intent(question, table):
+    # Returns None for non-aggregate questions, which keep using vector retrieval. That includes
+    # questions about a place missing from the data: whole-table figures would not answer them.
+    if names_shipment(question, table) or unknown_places(question, table):
+        return None
+    group_by = next((column for column, pattern in GROUP_KEYWORDS.items() if pattern.search(question)), None)
+    if not AGGREGATE_PATTERN.search(question) and not (
+            WEAK_AGGREGATE_PATTERN.search(question) and (group_by or GROUPING_CUE.search(question))):
+        return None
+    sort = next((order for pattern, order in SORT_KEYWORDS if pattern.search(question)), None)
+    return {"filters": detect_filters(question, table), "group_by": group_by, "sort": sort}
+
+
+def apply_filters(table, filters):
+    mask = np.ones(len(table), dtype=bool)
+    for column, values in filters.items():
+        if column == "city":
+            mask &= (table[ORIGIN_COLUMN].map(city_name).isin(values) |
+                     table[DESTINATION_COLUMN].map(city_name).isin(values)).to_numpy()
+        else:
+            mask &= table[column].isin(values).to_numpy()
+    return table[mask]
+
+
+def answer_tables(intent, table, summaries=None, sidebar_filters=None):
+    # Returns a list of (title, DataFrame) computed over the full table.
+    # sidebar_filters: {column: [allowed values]} from the page, applied before the question's own filters.
+    filters, group_by, sort = intent["filters"], intent["group_by"], intent["sort"]
+    sidebar_filters = {column: values for column, values in (sidebar_filters or {}).items() if values}
+    if sidebar_filters:
+        # The precomputed summaries cover every row, so they cannot be reused here
+        table, summaries = apply_filters(table, sidebar_filters), None
+    if filters:
+        subset = apply_filters(table, filters)
+        overall = aggregate(subset)
+        grouped = aggregate(subset, group_by) if group_by else None
+    else:
+        summaries = summaries or precompute_summaries(table)
+        overall = summaries["overall"]
+        grouped = summaries[group_by] if group_by else None
+    if grouped is None and sort is not None and filters:
+        # "most expensive truck route" without the word route still ranks routes
+        grouped = aggregate(apply_filters(table, filters), "route")
+
+    description = ", ".join(f"{column} in {list(values)}" for column, values in
+                            [*sidebar_filters.items(), *filters.items()]) or "no filters"
+    tables = [(f"Overall ({description})", overall)]
+    if grouped is not None:
+        column, ascending = sort or ("avg_cost_usd", False)
+        grouped = grouped.sort_values(column, ascending=ascending).head(MAX_CONTEXT_ROWS)
+        tables.append((f"By {group_by or 'route'} ({description})", grouped))
+    return tables
+
+
+def format_context(tables, total_rows):
+    # The first table is the overall one; its shipment count is the number of rows left after filtering
+    matched = int(tables[0][1]["shipments"].sum())
+    if matched == 0:
+        return (f"No shipments in the dataset ({total_rows} rows) match the question's filters ({tables[0][0]}). "
+                f"Say that no matching data was found; do not answer from other rows.")
+    scope = (f"all {total_rows} shipments in the dataset" if matched == total_rows else
+             f"the {matched} of {total_rows} shipments that match the filters")
+    parts = [f"The following tables were computed over {scope}. "
+             f"Costs are in USD, transit times in days. Use these numbers exactly."]
+    for title, frame in tables:
+        parts.append(f"{title}:\n{frame.to_string(index=False)}")
+    return "\n\n".join(parts)
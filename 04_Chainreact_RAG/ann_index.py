@@ -0,0 +1,168 @@
+import argparse
+import math
+import time
+
+import faiss
+import numpy as np
+
+# Index factory and filtered search for the Chain React retriever.
+#   flat  - exact L2 search, best for small tables
+#   ivfpq - inverted lists + product quantization, trained on a sample; tune with nprobe
+#   hnsw  - graph index; tune with ef_search
+# Metadata pre-filtering restricts the search to allowed row ids through a FAISS IDSelector.
+
+INDEX_KINDS = ("flat", "ivfpq", "hnsw")
+DEFAULT_TRAIN_SAMPLE = 100000
+DEFAULT_NPROBE = 16
+DEFAULT_EF_SEARCH = 64
+# FAISS wants roughly 39 training points per centroid, and 256 for an 8-bit PQ codebook
+MIN_POINTS_PER_CENTROID = 39
+FILTER_COLUMNS = ["Mode_of_Transport", "Origin", "Destination"]
+
+
+def default_nlist(n):
+    return max(1, min(65536, int(4 * math.sqrt(n))))
+
+
+def default_pq_m(dim, max_m=64):
+    # Number of PQ sub-quantizers; must divide the dimension
+    return max(m for m in range(1, max_m + 1) if dim % m == 0)
+
+
+def can_train_ivfpq(n, nlist, nbits=8):
+    return n >= max(nlist * MIN_POINTS_PER_CENTROID, 2 ** nbits)
+
+
+def build_index(embeddings, kind="flat", nlist=None, pq_m=None, nbits=8, hnsw_m=32, ef_construction=200,
+                train_sample=DEFAULT_TRAIN_SAMPLE, seed=0):
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    n, dim = embeddings.shape
+
+    if kind == "ivfpq":
+        nlist = nlist or default_nlist(n)
+        if not can_train_ivfpq(n, nlist, nbits):
+            # Too few rows to train the quantizers; exact search is also the fastest option here
+            kind = "flat"
+        else:
+            quantizer = faiss.IndexFlatL2(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m or default_pq_m(dim), nbits)
+            rng = np.random.default_rng(seed)
+            sample = embeddings[rng.choice(n, size=min(n, train_sample), replace=False)]
+            index.train(sample)
+            index.add(embeddings)
+            index.nprobe = DEFAULT_NPROBE
+            return index
+
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = DEFAULT_EF_SEARCH
+        index.add(embeddings)
+        return index
+
+    if kind != "flat":
+        raise ValueError(f"Unknown index kind '{kind}'. Choose one of {', '.join(INDEX_KINDS)}.")
+    index = faiss.IndexFlatL2(dim)
+    index.add(embeddings)
+    return index
+
+
+def index_kind(index):
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def search_parameters(index, allowed_ids=None, nprobe=None, ef_search=None):
+    selector = faiss.IDSelectorBatch(np.asarray(allowed_ids, dtype="int64")) if allowed_ids is not None else None
+    kind = index_kind(index)
+    if kind == "ivfpq":
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe or faiss.downcast_index(index).nprobe)
+    if kind == "hnsw":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search or faiss.downcast_index(index).hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+
+def search(index, queries, k, allowed_ids=None, nprobe=None, ef_search=None):
+    # Returns (distances, ids); ids of -1 mean fewer than k rows matched
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    if allowed_ids is not None and len(allowed_ids) == 0:
+        return np.full((len(queries), k), np.inf, dtype="float32"), np.full((len(queries), k), -1, dtype="int64")
+    params = search_parameters(index, allowed_ids, nprobe, ef_search)
+    if params is None:
+        return index.search(queries, k)
+    return index.search(queries, k, params=params)
+
+
+def filter_ids(dataframe, filters):
+    # filters: {column: [allowed values]}; empty selections are ignored. Returns None when unfiltered.
+    mask = np.ones(len(dataframe), dtype=bool)
+    active = False
+    for column, values in filters.items():
+        if values:
+            mask &= dataframe[column].isin(values).to_numpy()
+            active = True
+    return np.flatnonzero(mask) if active else None
+
+
+def recall_at_k(exact_ids, approx_ids, k):
+    hits = sum(len(set(e[:k]) & set(a[:k]) - {-1}) for e, a in zip(exact_ids, approx_ids))
+    return hits / (len(exact_ids) * k)
+
+
+def benchmark(embeddings, queries, k=10, configs=None):
+    # Recall@k and per-query latency of each configuration against exact search
+    configs = configs or [
+        {"kind": "flat"},
+        {"kind": "ivfpq", "nprobe": 1}, {"kind": "ivfpq", "nprobe": 8}, {"kind": "ivfpq", "nprobe": 32},
+        {"kind": "hnsw", "ef_search": 16}, {"kind": "hnsw", "ef_search": 64}, {"kind": "hnsw", "ef_search": 256},
+    ]
+    exact = build_index(embeddings, "flat")
+    _, exact_ids = exact.search(queries, k)
+
+    built = {}
+    results = []
+    for config in configs:
+        kind = config["kind"]
+        if kind not in built:
+            start = time.perf_counter()
+            built[kind] = (build_index(embeddings, kind), time.perf_counter() - start)
+        index, build_seconds = built[kind]
+        start = time.perf_counter()
+        _, ids = search(index, queries, k, nprobe=config.get("nprobe"), ef_search=config.get("ef_search"))
+        seconds = time.perf_counter() - start
+        results.append({**config, "built_as": index_kind(index), "build_seconds": build_seconds,
+                        f"recall@{k}": recall_at_k(exact_ids, ids, k),
+                        "ms_per_query": 1000 * seconds / len(queries)})
+    return results
+
+
+def synthetic_embeddings(rows, dim, clusters=256, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype("float32")
+    vectors = centers[rng.integers(0, clusters, size=rows)] + 0.3 * rng.normal(size=(rows, dim)).astype("float32")
+    return vectors.astype("float32")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs latency of the ANN index options.")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = synthetic_embeddings(args.rows + args.queries, args.dim)
+    embeddings, queries = vectors[:args.rows], vectors[args.rows:]
+    for result in benchmark(embeddings, queries, args.k):
+        knob = f"nprobe={result['nprobe']}" if "nprobe" in result else (
+            f"ef_search={result['ef_search']}" if "ef_search" in result else "")
+        print(f"{result['built_as']:<6} {knob:<14} recall@{args.k}={result[f'recall@{args.k}']:.3f} "
+              f"{result['ms_per_query']:.3f} ms/query (build {result['build_seconds']:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
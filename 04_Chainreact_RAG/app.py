@@ -1,7 +1,6 @@
 import streamlit as st
 from streamlit_option_menu import option_menu
 import openai
-import numpy as np
 import pandas as pd
 from langchain.chat_models import ChatOpenAI
 from langchain.document_loaders import CSVLoader
@@ -10,13 +9,53 @@ from langchain.prompts import ChatPromptTemplate
 from langchain.vectorstores import Chroma
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableLambda, RunnablePassthrough
-from openai.embeddings_utils import get_embedding
-import faiss
 import warnings
 import os
+from chat_stream import chat_completion, stream_chat_completion
+from conversation_memory import ConversationMemory
+from vector_store import VectorStore
+from embedding_service import get_embedder
+from ann_index import DEFAULT_EF_SEARCH, DEFAULT_NPROBE, FILTER_COLUMNS, INDEX_KINDS, filter_ids
+from hybrid_retriever import RETRIEVERS, BM25Index, CrossEncoderReranker, HybridRetriever
+from analytics import answer_tables, detect_intent, format_context, precompute_summaries, prepare_table
 
 warnings.filterwarnings("ignore")
 
+DATA_URL = 'https://raw.githubusercontent.com/11andrea2233/ChainReact/refs/heads/main/Transportation%20and%20distribution.csv'
+
+@st.cache_data(ttl=3600)
+def load_dataset():
+    dataframed = pd.read_csv(DATA_URL)
+    dataframed['combined'] = dataframed.apply(lambda row : ' '.join(row.values.astype(str)), axis = 1)
+    return dataframed
+
+# Typed Cost / transit columns and per-mode, per-route summaries for aggregate questions
+@st.cache_data(ttl=3600)
+def load_analytics():
+    table = prepare_table(load_dataset())
+    return table, precompute_summaries(table)
+
+# The index is kept in memory across reruns and persisted to disk across restarts;
+# only rows whose content changed are sent to the embeddings API
+@st.cache_resource
+def load_embedder():
+    return get_embedder()
+
+@st.cache_resource
+def load_index(documents, index_kind="flat"):
+    embedder = load_embedder()
+    store = VectorStore(model=embedder.name, index_kind=index_kind)
+    index = store.sync(documents, embedder.embed)
+    return index, store.last_update
+
+@st.cache_resource
+def load_bm25(documents):
+    return BM25Index(documents)
+
+@st.cache_resource
+def load_reranker():
+    return CrossEncoderReranker()
+
 # Sidebar for navigation and API key input
 api_key = st.sidebar.text_input("Enter your OpenAI API Key:", type="password")
 openai.api_key = api_key
@@ -62,14 +101,24 @@ else:
         st.text("Connect with me on LinkedIn 😊 [Andrea Arana](https://www.linkedin.com/in/andrea-a-732769168/)")
 
     elif page == "Chain React":
-        dataframed = pd.read_csv('https://raw.githubusercontent.com/11andrea2233/ChainReact/refs/heads/main/Transportation%20and%20distribution.csv')
-        dataframed['combined'] = dataframed.apply(lambda row : ' '.join(row.values.astype(str)), axis = 1)
+        dataframed = load_dataset()
         documents = dataframed['combined'].tolist()
-        embeddings = [get_embedding(doc, engine = "text-embedding-3-small") for doc in documents]
-        embedding_dim = len(embeddings[0])
-        embeddings_np = np.array(embeddings).astype('float32')
-        index = faiss.IndexFlatL2(embedding_dim)
-        index.add(embeddings_np)
+        with st.sidebar.expander("Retrieval settings"):
+            index_kind = st.selectbox("Index type", INDEX_KINDS, help="flat is exact; ivfpq and hnsw trade recall for speed on large tables")
+            retriever_mode = st.selectbox("Retriever", RETRIEVERS, help="hybrid fuses BM25 keyword matches with the vector search")
+            rerank = st.checkbox("Rerank with a local cross-encoder", help="needs sentence-transformers")
+            top_k = st.slider("Rows retrieved (k)", min_value=1, max_value=20, value=2)
+            nprobe = st.slider("IVF lists probed (nprobe)", min_value=1, max_value=256, value=DEFAULT_NPROBE) if index_kind == "ivfpq" else None
+            ef_search = st.slider("HNSW search breadth (efSearch)", min_value=8, max_value=512, value=DEFAULT_EF_SEARCH) if index_kind == "hnsw" else None
+            filters = {column: st.multiselect(f"Filter {column}", sorted(dataframed[column].dropna().unique()))
+                       for column in FILTER_COLUMNS if column in dataframed.columns}
+        index, index_update = load_index(documents, index_kind)
+        with st.sidebar.expander("Vector index"):
+            st.write(f"Rows indexed: {index.ntotal}")
+            st.write(f"Embedded on last sync: {index_update['embedded']}, reused: {index_update['reused']}")
+            st.write("Loaded from disk (warm start)" if index_update['warm_start'] else "Index rebuilt")
+        retriever = HybridRetriever(documents, index, load_embedder(), bm25=load_bm25(documents),
+                                    reranker=load_reranker() if rerank else None)
         
         System_Prompt = """
             Role: Data Analyst
@@ -80,39 +129,60 @@ else:
                 Example1: Using this dataset, can you calculate the average transit time and cost for shipments made by truck, and identify which truck route is the most expensive on average?
 """
 
+        # Requests carry the system prompt, a rolling summary of older turns and the recent turns;
+        # the full transcript is only kept for display
         def initialize_conversation(prompt):
-            if 'message' not in st.session_state:
-                st.session_state.message = []
-                st.session_state.message.append({"role": "system", "content": System_Prompt})
-                chat =  openai.ChatCompletion.create(model = "gpt-4o-mini", messages = st.session_state.message, temperature=0.5, max_tokens=1500, top_p=1, frequency_penalty=0, presence_penalty=0)
-                response = chat.choices[0].message.content
-                st.session_state.message.append({"role": "assistant", "content": response})
+            if 'memory' not in st.session_state:
+                st.session_state.memory = ConversationMemory(prompt)
+                response = chat_completion(st.session_state.memory.prefix(), model="gpt-4o-mini", temperature=0.5, max_tokens=1500, top_p=1, frequency_penalty=0, presence_penalty=0)
+                st.session_state.memory.add("assistant", response)
 
         initialize_conversation(System_Prompt)
+        memory = st.session_state.memory
 
-        for messages in st.session_state.message:
-            if messages['role'] == 'system':
-                continue
-            else:
-                with st.chat_message(messages["role"]):
-                    st.markdown(messages["content"])
+        for messages in memory.transcript:
+            with st.chat_message(messages["role"]):
+                st.markdown(messages["content"])
 
         if user_message := st.chat_input("Ask me anything about Supply Chain and Logistics!"):
             with st.chat_message("user"):
                 st.markdown(user_message)
-            query_embedding = get_embedding(user_message, engine='text-embedding-3-small')
-            query_embedding_np = np.array([query_embedding]).astype('float32')    
-            _, indices = index.search(query_embedding_np, 2)
-            retrieved_docs = [documents[i] for i in indices[0]]
-            context = ' '.join(retrieved_docs)
+            table, summaries = load_analytics()
+            intent = detect_intent(user_message, table)
+            computed = []
+            if intent is not None:
+                # Aggregate questions are answered from group-bys over every row (within the sidebar filters), not the top-k matches
+                computed = answer_tables(intent, table, summaries, sidebar_filters=filters)
+                context = format_context(computed, len(table))
+            else:
+                ids = retriever.retrieve(user_message, top_k, mode=retriever_mode,
+                                         allowed_ids=filter_ids(dataframed, filters), nprobe=nprobe,
+                                         ef_search=ef_search, rerank=rerank)
+                retrieved_docs = [documents[i] for i in ids]
+                context = ' '.join(retrieved_docs)
             structured_prompt = f"Context:\n{context}\n\nQuery:\n{user_message}\n\nResponse:"
-            chat =  openai.ChatCompletion.create(model = "gpt-4o-mini", messages = st.session_state.message + [{"role": "user", "content": structured_prompt}], temperature=0.5, max_tokens=1500, top_p=1, frequency_penalty=0, presence_penalty=0)
-            st.session_state.message.append({"role": "user", "content": user_message})
-            chat = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=st.session_state.message,
-            )
-            response = chat.choices[0].message.content
+            # One completion per message; the retrieved context is only sent with this turn
+            prompt_messages, prompt_tokens = memory.build(structured_prompt)
+            memory.add("user", user_message)
+            metrics = {"prompt_tokens": prompt_tokens}
             with st.chat_message("assistant"):
-                st.markdown(response)
-            st.session_state.message.append({"role": "assistant", "content": response})
\ No newline at end of file
+                response = st.write_stream(stream_chat_completion(prompt_messages, metrics=metrics, temperature=0.5,
+                                                                  max_tokens=1500))
+                if computed:
+                    with st.expander("Computed over the full dataset"):
+                        for title, frame in computed:
+                            st.caption(title)
+                            st.dataframe(frame, hide_index=True)
+                st.caption(f"Time to first token: {1000 * metrics.get('time_to_first_token', 0):.0f} ms · "
+                           f"total: {metrics.get('total_seconds', 0):.2f} s · "
+                           f"prompt: {prompt_tokens} tokens")
+            memory.add("assistant", response)
+            st.session_state.setdefault("latencies", []).append(metrics)
+
+        if st.session_state.get("latencies"):
+            with st.sidebar.expander("Response latency"):
+                for i, metrics in enumerate(st.session_state.latencies, start=1):
+                    st.write(f"#{i}: first token {1000 * metrics.get('time_to_first_token', 0):.0f} ms, "
+                             f"total {metrics.get('total_seconds', 0):.2f} s, prompt {metrics.get('prompt_tokens', 0)} tokens")
+                st.write(f"Prompt budget: {memory.token_budget} tokens · turns summarized: {memory.summarized} "
+                         f"({memory.compactions} compactions)")
\ No newline at end of file
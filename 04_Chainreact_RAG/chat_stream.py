@@ -0,0 +1,32 @@
+import time
+
+import openai
+
+from embedding_service import with_backoff
+
+# Streaming chat completions for the Chain React page.
+# Tokens are yielded as they arrive so st.write_stream can render them immediately.
+# Rate limits and transient errors are retried with the same backoff as the News Summarizer.
+# Point OPENAI_API_BASE at ../03_News_Summarizer/mock_openai_server.py to test offline.
+
+MODEL = "gpt-4o-mini"
+
+
+def chat_completion(messages, model=MODEL, **kwargs):
+    chat = with_backoff(lambda: openai.ChatCompletion.create(model=model, messages=messages, **kwargs))
+    return chat.choices[0].message.content
+
+
+def stream_chat_completion(messages, model=MODEL, metrics=None, **kwargs):
+    # Fills metrics with time to first token and total latency, both in seconds
+    metrics = metrics if metrics is not None else {}
+    start = time.perf_counter()
+    response = with_backoff(lambda: openai.ChatCompletion.create(model=model, messages=messages, stream=True, **kwargs))
+    for chunk in response:
+        if not chunk["choices"]:
+            continue
+        delta = chunk["choices"][0]["delta"].get("content")
+        if delta:
+            metrics.setdefault("time_to_first_token", time.perf_counter() - start)
+            yield delta
+    metrics["total_seconds"] = time.perf_counter() - start
@@ -0,0 +1,94 @@
+import os
+
+import tiktoken
+
+from chat_stream import chat_completion
+
+# Token-budgeted chat memory for the Chain React page.
+# The full transcript is kept for display, but each request only carries the system prompt,
+# a rolling summary of older turns and the most recent turns verbatim. When a prompt would
+# exceed the budget, the oldest verbatim turns are folded into the summary in one extra call,
+# down to a low-water mark so that compaction happens rarely rather than on every message.
+
+MODEL = "gpt-4o-mini"
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("CHAINREACT_PROMPT_TOKEN_BUDGET", "6000"))
+DEFAULT_KEEP_RECENT = 4
+# Fraction of the budget to get back under when compacting
+LOW_WATER = 0.6
+SUMMARY_MAX_TOKENS = 400
+# Every chat message costs a few tokens of framing on top of its content
+TOKENS_PER_MESSAGE = 4
+
+Summary_Prompt = """You maintain the running memory of a conversation between a supply chain data analyst and an assistant.
+Update the summary with the new turns below. Keep figures, shipment IDs, routes, filters and conclusions the user may refer back to. Drop pleasantries. Answer with the updated summary only, at most 200 words."""
+
+
+def get_encoding(model=MODEL):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Older tiktoken releases do not know the gpt-4o family yet
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_message_tokens(messages, model=MODEL):
+    encoding = get_encoding(model)
+    return sum(TOKENS_PER_MESSAGE + len(encoding.encode(message["content"])) for message in messages) + 2
+
+
+def summarize_turns(summary, turns, model=MODEL):
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    summary = chat_completion(
+        model=model, temperature=0, max_tokens=SUMMARY_MAX_TOKENS,
+        messages=[{"role": "system", "content": Summary_Prompt},
+                  {"role": "user", "content": f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{transcript}"}])
+    return summary.strip()
+
+
+class ConversationMemory:
+    def __init__(self, system_prompt, model=MODEL, token_budget=DEFAULT_TOKEN_BUDGET,
+                 keep_recent=DEFAULT_KEEP_RECENT, summarize=summarize_turns):
+        self.system_prompt = system_prompt
+        self.model = model
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.summarize = summarize
+        self.transcript = []
+        self.summary = ""
+        # transcript[:summarized] is represented by self.summary
+        self.summarized = 0
+        self.compactions = 0
+
+    def add(self, role, content):
+        self.transcript.append({"role": role, "content": content})
+
+    def prefix(self):
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        return messages + self.transcript[self.summarized:]
+
+    def compact(self, prompt_tokens):
+        # Folds the oldest verbatim turns into the summary until the prompt is under the low-water mark
+        target = int(self.token_budget * LOW_WATER)
+        encoding = get_encoding(self.model)
+        end = self.summarized
+        last = len(self.transcript) - self.keep_recent
+        while end < last and prompt_tokens > target:
+            prompt_tokens -= TOKENS_PER_MESSAGE + len(encoding.encode(self.transcript[end]["content"]))
+            end += 1
+        if end > self.summarized:
+            self.summary = self.summarize(self.summary, self.transcript[self.summarized:end], self.model)
+            self.summarized = end
+            self.compactions += 1
+
+    def build(self, user_prompt):
+        # Messages for the next request: memory plus this turn's prompt (which may carry retrieved context)
+        request = {"role": "user", "content": user_prompt}
+        messages = self.prefix() + [request]
+        prompt_tokens = count_message_tokens(messages, self.model)
+        if prompt_tokens > self.token_budget:
+            self.compact(prompt_tokens)
+            messages = self.prefix() + [request]
+            prompt_tokens = count_message_tokens(messages, self.model)
+        return messages, prompt_tokens
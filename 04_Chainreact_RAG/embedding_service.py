@@ -0,0 +1,183 @@
+import argparse
+import hashlib
+import os
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import openai
+import tiktoken
+
+# Embedding service used for RAG ingestion and queries.
+# OpenAIEmbedder packs many inputs into each embeddings request (bounded by a token budget),
+# keeps several requests in flight, retries with jittered backoff and preserves input order.
+# HashEmbedder and SentenceTransformerEmbedder run locally so ingestion can be benchmarked offline.
+# Select the backend with EMBEDDING_BACKEND=openai|hash|sentence-transformers.
+
+DEFAULT_MODEL = "text-embedding-3-small"
+# The API accepts at most 2048 inputs and 8191 tokens per input
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_INPUT = 8191
+DEFAULT_TOKEN_BUDGET = 100000
+DEFAULT_MAX_WORKERS = 4
+MAX_RETRIES = 6
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIError,  # generic 5xx responses, usually transient
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+
+def retry_after(error):
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def with_backoff(call, max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    # Exponential backoff with full jitter; a server-provided Retry-After wins when present.
+    # Shared by the embeddings requests and the chat calls (chat_stream, conversation_memory).
+    for attempt in range(max_retries + 1):
+        try:
+            return call()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            time.sleep(delay)
+
+
+class OpenAIEmbedder:
+    def __init__(self, model=DEFAULT_MODEL, token_budget=DEFAULT_TOKEN_BUDGET,
+                 max_inputs=MAX_INPUTS_PER_REQUEST, max_workers=DEFAULT_MAX_WORKERS):
+        self.model = model
+        self.name = f"openai:{model}"
+        self.token_budget = token_budget
+        self.max_inputs = max_inputs
+        self.max_workers = max_workers
+        self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.requests = 0
+
+    def truncate(self, text):
+        # Returns (text, token count); longer inputs are cut to the API limit, since one oversized
+        # input would make the API reject the whole request
+        tokens = self.encoding.encode(text)
+        if len(tokens) > MAX_TOKENS_PER_INPUT:
+            return self.encoding.decode(tokens[:MAX_TOKENS_PER_INPUT]), MAX_TOKENS_PER_INPUT
+        return text, len(tokens)
+
+    def pack(self, token_counts):
+        # Greedily fills each request up to the token budget / input limit; returns lists of positions
+        batches, current, current_tokens = [], [], 0
+        for i, tokens in enumerate(token_counts):
+            if current and (current_tokens + tokens > self.token_budget or len(current) == self.max_inputs):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def embed_batch(self, texts):
+        # The API rejects empty strings
+        inputs = [text if text.strip() else " " for text in texts]
+        response = with_backoff(lambda: openai.Embedding.create(input=inputs, model=self.model))
+        self.requests += 1
+        data = sorted(response["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+
+    def embed(self, texts):
+        texts = [str(text) for text in texts]
+        if not texts:
+            return np.empty((0, 0), dtype="float32")
+        texts, token_counts = zip(*(self.truncate(text) for text in texts))
+        batches = self.pack(token_counts)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # executor.map yields results in submission order, so rows line up with the input
+            results = executor.map(lambda batch: self.embed_batch([texts[i] for i in batch]), batches)
+            vectors = [vector for batch_vectors in results for vector in batch_vectors]
+        return np.asarray(vectors, dtype="float32")
+
+
+class HashEmbedder:
+    # Deterministic feature-hashing embedder (word unigrams and bigrams); no model, no network
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.name = f"hash:{dim}"
+        self.requests = 0
+
+    def embed_one(self, text):
+        vector = np.zeros(self.dim, dtype="float32")
+        words = re.findall(r"\w+", text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+            vector[digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts):
+        return np.asarray([self.embed_one(str(text)) for text in texts], dtype="float32").reshape(-1, self.dim)
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_name="all-MiniLM-L6-v2", batch_size=64):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.name = f"sentence-transformers:{model_name}"
+        self.batch_size = batch_size
+        self.requests = 0
+
+    def embed(self, texts):
+        vectors = self.model.encode([str(text) for text in texts], batch_size=self.batch_size,
+                                    normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype="float32")
+
+
+def get_embedder(backend=None):
+    backend = backend or os.environ.get("EMBEDDING_BACKEND", "openai")
+    if backend == "openai":
+        return OpenAIEmbedder()
+    if backend == "hash":
+        return HashEmbedder()
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbedder()
+    raise ValueError(f"Unknown embedding backend '{backend}'")
+
+
+def main():
+    # Offline ingestion benchmark: python embedding_service.py --backend hash --rows 100000
+    parser = argparse.ArgumentParser(description="Benchmark document embedding throughput.")
+    parser.add_argument("--backend", default="hash", choices=["openai", "hash", "sentence-transformers"])
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      "Transportation and distribution.csv"))
+    parser.add_argument("--rows", type=int, default=10000, help="rows to embed (the CSV is repeated as needed)")
+    args = parser.parse_args()
+
+    import pandas as pd
+    dataframed = pd.read_csv(args.csv)
+    base = dataframed.apply(lambda row: ' '.join(row.values.astype(str)), axis=1).tolist()
+    documents = [f"{base[i % len(base)]} #{i}" for i in range(args.rows)]
+
+    embedder = get_embedder(args.backend)
+    start = time.perf_counter()
+    vectors = embedder.embed(documents)
+    seconds = time.perf_counter() - start
+    print(f"{embedder.name}: {len(documents)} rows, dim {vectors.shape[1]}, {embedder.requests} requests, "
+          f"{seconds:.2f}s ({len(documents) / seconds:.1f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
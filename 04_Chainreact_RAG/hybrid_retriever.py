@@ -0,0 +1,185 @@
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+
+from ann_index import build_index, search
+
+# Hybrid retrieval for the Chain React page.
+# Shipment IDs ("T001") and city names ("Chicago, IL") are exact tokens that embeddings match
+# poorly, so an in-memory BM25 inverted index over the row strings runs next to the FAISS search.
+# Both candidate lists are merged with reciprocal-rank fusion and can optionally be reordered by a
+# local cross-encoder.
+
+RETRIEVERS = ("hybrid", "vector", "bm25")
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Standard RRF damping constant; larger values flatten the contribution of top ranks
+RRF_K = 60
+CANDIDATE_MULTIPLIER = 4
+MIN_CANDIDATES = 20
+DEFAULT_RERANKER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+
+class BM25Index:
+    def __init__(self, documents, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        postings = {}
+        lengths = np.zeros(self.size, dtype="float32")
+        for doc_id, document in enumerate(documents):
+            terms = tokenize(document)
+            lengths[doc_id] = len(terms)
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc_id)
+                postings[term][1].append(count)
+        average_length = lengths.mean() if self.size else 0.0
+        # Per-document length normalisation is folded in once at build time
+        self.norms = k1 * (1 - b + b * lengths / average_length) if average_length else np.full(self.size, k1)
+        self.postings = {term: (np.asarray(ids, dtype="int64"), np.asarray(counts, dtype="float32"))
+                         for term, (ids, counts) in postings.items()}
+        self.idf = {term: float(np.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5)))
+                    for term, (ids, _) in self.postings.items()}
+
+    def scores(self, query):
+        scores = np.zeros(self.size, dtype="float32")
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, counts = self.postings[term]
+            scores[ids] += self.idf[term] * counts * (self.k1 + 1) / (counts + self.norms[ids])
+        return scores
+
+    def search(self, query, k, allowed_ids=None):
+        # Returns row ids of the k best-scoring rows, best first; rows without any query term are skipped
+        scores = self.scores(query)
+        if allowed_ids is not None:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[np.asarray(allowed_ids, dtype="int64")] = True
+            scores[~mask] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")].tolist()
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    # rankings: lists of row ids, best first. Returns ids ordered by fused score.
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused, key=fused.get, reverse=True)
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name=DEFAULT_RERANKER):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name)
+        self.name = model_name
+
+    def rerank(self, query, documents, ids):
+        if not ids:
+            return ids
+        scores = self.model.predict([(query, documents[i]) for i in ids], show_progress_bar=False)
+        return [ids[i] for i in np.argsort(-np.asarray(scores), kind="stable")]
+
+
+class HybridRetriever:
+    def __init__(self, documents, index, embedder, bm25=None, reranker=None):
+        self.documents = documents
+        self.index = index
+        self.embedder = embedder
+        self.bm25 = bm25 or BM25Index(documents)
+        self.reranker = reranker
+
+    def vector_ids(self, query, k, allowed_ids=None, nprobe=None, ef_search=None):
+        _, indices = search(self.index, self.embedder.embed([query]), k, allowed_ids=allowed_ids,
+                            nprobe=nprobe, ef_search=ef_search)
+        return [int(i) for i in indices[0] if i != -1]
+
+    def retrieve(self, query, k, mode="hybrid", allowed_ids=None, nprobe=None, ef_search=None, rerank=False):
+        # Returns up to k row ids, best first
+        candidates = max(k * CANDIDATE_MULTIPLIER, MIN_CANDIDATES) if mode == "hybrid" or rerank else k
+        rankings = []
+        if mode in ("hybrid", "vector"):
+            rankings.append(self.vector_ids(query, candidates, allowed_ids, nprobe, ef_search))
+        if mode in ("hybrid", "bm25"):
+            rankings.append(self.bm25.search(query, candidates, allowed_ids))
+        if mode not in RETRIEVERS:
+            raise ValueError(f"Unknown retriever '{mode}'. Choose one of {', '.join(RETRIEVERS)}.")
+        ids = reciprocal_rank_fusion(rankings) if len(rankings) > 1 else rankings[0]
+        if rerank and self.reranker is not None:
+            ids = self.reranker.rerank(query, self.documents, ids)
+        return ids[:k]
+
+
+def evaluation_queries(dataframe):
+    # (query, set of relevant row ids): one lookup by shipment ID and one by route per row
+    queries = []
+    id_column = next(column for column in dataframe.columns if "Shipment_ID" in column)
+    routes = dataframe.groupby(["Mode_of_Transport", "Origin", "Destination"]).indices
+    for row_id, row in enumerate(dataframe.itertuples(index=False)):
+        row = dict(zip(dataframe.columns, row))
+        queries.append((f"What do we know about shipment {row[id_column]}?", {row_id}))
+        key = (row["Mode_of_Transport"], row["Origin"], row["Destination"])
+        queries.append((f"How long does a {key[0].lower()} shipment from {key[1]} to {key[2]} take?",
+                        set(routes[key].tolist())))
+    return queries
+
+
+def evaluate(retriever, queries, k, mode, rerank=False):
+    hits = 0
+    latencies = []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        ids = retriever.retrieve(query, k, mode=mode, rerank=rerank)
+        latencies.append(time.perf_counter() - start)
+        hits += bool(relevant & set(ids))
+    latencies = np.asarray(latencies) * 1000
+    return {"mode": mode + (" + rerank" if rerank else ""), f"hit@{k}": hits / len(queries),
+            "p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95))}
+
+
+def main():
+    # Offline evaluation: python hybrid_retriever.py --backend hash --k 2
+    parser = argparse.ArgumentParser(description="Hit rate and query latency of the Chain React retrievers.")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                      "Transportation and distribution.csv"))
+    parser.add_argument("--backend", default="hash", choices=["openai", "hash", "sentence-transformers"])
+    parser.add_argument("--index", default="flat", choices=["flat", "ivfpq", "hnsw"])
+    parser.add_argument("--k", type=int, default=2)
+    parser.add_argument("--rerank", action="store_true", help="also evaluate the cross-encoder reranker")
+    args = parser.parse_args()
+
+    import pandas as pd
+    from embedding_service import get_embedder
+    dataframed = pd.read_csv(args.csv)
+    documents = dataframed.apply(lambda row: ' '.join(row.values.astype(str)), axis=1).tolist()
+    embedder = get_embedder(args.backend)
+    start = time.perf_counter()
+    retriever = HybridRetriever(documents, build_index(embedder.embed(documents), args.index), embedder,
+                                reranker=CrossEncoderReranker() if args.rerank else None)
+    print(f"{len(documents)} rows indexed with {embedder.name} in {time.perf_counter() - start:.2f}s")
+
+    queries = evaluation_queries(dataframed)
+    runs = [(mode, False) for mode in RETRIEVERS] + ([("hybrid", True)] if args.rerank else [])
+    for mode, rerank in runs:
+        result = evaluate(retriever, queries, args.k, mode, rerank)
+        print(f"{result['mode']:<16} hit@{args.k}={result[f'hit@{args.k}']:.3f} "
+              f"p50 {result['p50_ms']:.2f} ms  p95 {result['p95_ms']:.2f} ms  ({len(queries)} queries)")
+
+
+if __name__ == "__main__":
+    main()
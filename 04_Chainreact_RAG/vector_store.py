@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+
+import faiss
+import numpy as np
+
+from ann_index import build_index
+
+# On-disk embedding store and FAISS index for the Chain React page.
+# Every row is keyed by a content hash, so only new or changed rows are re-embedded.
+# When nothing changed, the saved index is loaded (memory-mapped where FAISS supports it)
+# without a single embedding call.
+
+DEFAULT_STORE_DIR = os.environ.get(
+    "CHAINREACT_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".vector_store"))
+EMBEDDING_MODEL = "openai:text-embedding-3-small"
+
+EMBEDDINGS_FILE = "embeddings.npy"
+HASHES_FILE = "hashes.json"
+INDEX_FILE = "index.faiss"
+META_FILE = "meta.json"
+
+
+def row_hash(document, model=EMBEDDING_MODEL):
+    return hashlib.sha256(f"{model}\x00{document}".encode("utf-8")).hexdigest()
+
+
+def dataset_hash(hashes):
+    return hashlib.sha256("".join(hashes).encode("utf-8")).hexdigest()
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def read_index(path):
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Not every index type can be memory-mapped
+        return faiss.read_index(path)
+
+
+class VectorStore:
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, model=EMBEDDING_MODEL, index_kind="flat"):
+        self.store_dir = store_dir
+        self.model = model
+        self.index_kind = index_kind
+        os.makedirs(store_dir, exist_ok=True)
+        self.last_update = {"embedded": 0, "reused": 0, "warm_start": False}
+
+    def path(self, name):
+        return os.path.join(self.store_dir, name)
+
+    def index_path(self):
+        return self.path(f"{self.index_kind}_{INDEX_FILE}")
+
+    def load_embeddings(self):
+        # Returns ({row_hash: row number}, embeddings matrix) from the previous build, if any
+        if not (os.path.exists(self.path(EMBEDDINGS_FILE)) and os.path.exists(self.path(HASHES_FILE))):
+            return {}, None
+        hashes = read_json(self.path(HASHES_FILE))
+        embeddings = np.load(self.path(EMBEDDINGS_FILE), mmap_mode="r")
+        return {h: i for i, h in enumerate(hashes)}, embeddings
+
+    def sync(self, documents, embed_documents):
+        # embed_documents takes a list of strings and returns one vector per string, in order
+        if not documents:
+            # Nothing to embed and no dimension to build an index with
+            raise ValueError("No documents to index: the dataset is empty.")
+        hashes = [row_hash(doc, self.model) for doc in documents]
+        current_hash = dataset_hash(hashes)
+
+        if os.path.exists(self.path(META_FILE)) and os.path.exists(self.index_path()):
+            meta = read_json(self.path(META_FILE))
+            if meta.get("dataset_hash") == current_hash and self.index_kind in meta.get("indexes", []):
+                self.last_update = {"embedded": 0, "reused": len(documents), "warm_start": True}
+                return read_index(self.index_path())
+
+        known, previous = self.load_embeddings()
+        missing = [i for i, h in enumerate(hashes) if h not in known]
+        new_vectors = embed_documents([documents[i] for i in missing]) if missing else []
+        new_rows = dict(zip(missing, new_vectors))
+
+        dim = len(new_vectors[0]) if len(new_vectors) else previous.shape[1]
+        embeddings = np.empty((len(documents), dim), dtype="float32")
+        for i, h in enumerate(hashes):
+            embeddings[i] = new_rows[i] if i in new_rows else previous[known[h]]
+
+        index = build_index(embeddings, self.index_kind)
+        # Write the new matrix next to the old one first; the old file may still be memory-mapped
+        tmp_embeddings = self.path(f"{EMBEDDINGS_FILE}.tmp.npy")
+        np.save(tmp_embeddings, embeddings)
+        os.replace(tmp_embeddings, self.path(EMBEDDINGS_FILE))
+        write_json(self.path(HASHES_FILE), hashes)
+        faiss.write_index(index, f"{self.index_path()}.tmp")
+        os.replace(f"{self.index_path()}.tmp", self.index_path())
+
+        # Other index kinds built from the same embeddings stay valid only if the rows did not change
+        indexes = [self.index_kind]
+        if missing == [] and os.path.exists(self.path(META_FILE)):
+            meta = read_json(self.path(META_FILE))
+            if meta.get("dataset_hash") == current_hash:
+                indexes = sorted(set(meta.get("indexes", [])) | {self.index_kind})
+        write_json(self.path(META_FILE), {"dataset_hash": current_hash, "model": self.model, "dim": dim,
+                                          "rows": len(documents), "indexes": indexes})
+
+        self.last_update = {"embedded": len(missing), "reused": len(documents) - len(missing), "warm_start": False}
+        return index
@@ -0,0 +1,140 @@
+import argparse
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Numeric "analog" retrieval for the forecast context.
+# Every historical window of `window` closing prices is z-normalized, so matches are about shape
+# rather than price level. For z-normalized vectors ||a - b||^2 = 2w - 2 a.b, which turns the search
+# into one matrix-vector product (or a FAISS flat search for very long histories). Each match comes
+# with the `horizon` periods that followed it, as returns relative to the window's last close.
+# Nothing here calls the network.
+
+DEFAULT_WINDOW = 30
+DEFAULT_HORIZON = 12
+DEFAULT_K = 5
+# Above this many windows the FAISS path is used when faiss is installed
+FAISS_MIN_WINDOWS = 200000
+
+
+def znormalize(windows):
+    windows = np.asarray(windows, dtype="float64")
+    mean = windows.mean(axis=-1, keepdims=True)
+    std = windows.std(axis=-1, keepdims=True)
+    # Flat windows have no shape; leave them at zero instead of dividing by zero
+    return np.divide(windows - mean, std, out=np.zeros_like(windows), where=std > 1e-12).astype("float32")
+
+
+class AnalogIndex:
+    def __init__(self, values, window=DEFAULT_WINDOW, horizon=DEFAULT_HORIZON, dates=None, use_faiss=None):
+        self.values = np.asarray(values, dtype="float64")
+        self.window = window
+        self.horizon = horizon
+        self.dates = dates
+        # Only windows followed by a full horizon are indexed
+        count = len(self.values) - window - horizon + 1
+        if count < 1:
+            raise ValueError(f"Need at least {window + horizon} periods to index windows of {window}.")
+        self.windows = np.ascontiguousarray(znormalize(sliding_window_view(self.values[:window + count - 1], window)))
+        ends = np.arange(window - 1, window - 1 + count)
+        following = sliding_window_view(self.values[window:], horizon)[:count]
+        self.following = following / self.values[ends][:, None] - 1.0
+        self.index = None
+        if use_faiss or (use_faiss is None and count >= FAISS_MIN_WINDOWS):
+            try:
+                import faiss
+                self.index = faiss.IndexFlatL2(window)
+                self.index.add(self.windows)
+            except ImportError:
+                self.index = None
+
+    def __len__(self):
+        return len(self.windows)
+
+    def distances(self, query):
+        # Squared z-normalized Euclidean distance from the query to every window
+        return np.maximum(2.0 * self.window - 2.0 * (self.windows @ query), 0.0)
+
+    def candidates(self, query, count):
+        if self.index is not None:
+            distances, ids = self.index.search(query[None, :], min(count, len(self)))
+            keep = ids[0] != -1
+            return ids[0][keep], distances[0][keep]
+        distances = self.distances(query)
+        if count < len(distances):
+            ids = np.argpartition(distances, count - 1)[:count]
+        else:
+            ids = np.arange(len(distances))
+        ids = ids[np.argsort(distances[ids], kind="stable")]
+        return ids, distances[ids]
+
+    def query(self, recent, k=DEFAULT_K):
+        # recent: the latest `window` closes of the user's series, oldest first
+        recent = np.asarray(recent, dtype="float64")[-self.window:]
+        if len(recent) < self.window:
+            raise ValueError(f"Need the latest {self.window} periods to search for analogs.")
+        query = znormalize(recent)
+        # Overlapping windows are near-copies of each other; keep matches at least half a window apart
+        ids, distances = self.candidates(query, k * self.window)
+        chosen = []
+        for i, distance in zip(ids.tolist(), distances.tolist()):
+            if all(abs(i - j) >= self.window // 2 for j, _ in chosen):
+                chosen.append((i, distance))
+                if len(chosen) == k:
+                    break
+        return [self.match(i, distance) for i, distance in chosen]
+
+    def match(self, i, distance):
+        end = i + self.window - 1
+        match = {"start": i, "end": end, "distance": float(np.sqrt(distance)),
+                 "following_returns": self.following[i]}
+        if self.dates is not None:
+            match["start_date"] = str(self.dates[i])
+            match["end_date"] = str(self.dates[end])
+        return match
+
+
+def analog_forecast(matches, last_value):
+    # Median path of what followed the analogs, scaled to the query's last value
+    if not matches:
+        return None
+    returns = np.vstack([match["following_returns"] for match in matches])
+    return last_value * (1.0 + np.median(returns, axis=0))
+
+
+def describe_matches(matches):
+    # Compact text for the forecast prompt
+    lines = []
+    for match in matches:
+        returns = match["following_returns"]
+        span = f"{match['start_date']} to {match['end_date']}" if "start_date" in match else \
+            f"periods {match['start']}-{match['end']}"
+        lines.append(f"{span} (distance {match['distance']:.2f}): next {len(returns)} periods "
+                     f"{100 * returns[-1]:+.1f}% (low {100 * returns.min():+.1f}%, high {100 * returns.max():+.1f}%)")
+    return "\n".join(lines)
+
+
+def main():
+    # python analog_index.py --file TSLA-2.csv --window 30 --k 5
+    from price_data import HISTORICAL_FILE, load_prices
+    parser = argparse.ArgumentParser(description="Find the historical windows most similar to the latest one.")
+    parser.add_argument("--file", default=HISTORICAL_FILE)
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--faiss", action="store_true")
+    args = parser.parse_args()
+
+    series = load_prices(args.file)
+    start = time.perf_counter()
+    index = AnalogIndex(series.close, args.window, args.horizon, dates=series.dates, use_faiss=args.faiss or None)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    matches = index.query(series.close[-args.window:], args.k)
+    print(f"{len(index)} windows indexed in {1000 * built:.1f} ms, queried in {1000 * (time.perf_counter() - start):.2f} ms")
+    print(describe_matches(matches))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,40 +13,16 @@ from folium import plugins
 from folium.plugins import MarkerCluster
 import matplotlib.pyplot as plt
 import logging
+from price_data import HISTORICAL_FILE, load_prices, typed_columns, typed_dates
+from price_digest import digest_text, token_report
+from forecasting import METHODS, forecast as statistical_forecast
+from analog_index import DEFAULT_WINDOW, AnalogIndex
+from llm_forecaster import forecast_with_llm
 
 warnings.filterwarnings("ignore")
 
 st.set_page_config(page_title="📈 StockPrize Ally", layout="wide")
 
-System_Prompt_Forecast = """
-Role:
-You are StockPrize Ally, an AI-based Stock Price Forecasting Model designed to generate predictions of future stock prices based on historical data. Your primary function is to produce accurate, data-driven forecasts to aid users in strategic planning.
-
-Instructions:
-
-Accept a list of historical stock prices data as input, consisting of numerical values representing closing price, open price, high price, low price, and volume for past periods.
-Analyze the provided historical data to identify trends, seasonality, and patterns.
-Generate a stock prices forecast for the next 12 periods using appropriate statistical or machine learning models.
-Output the forecasted values as a comma-separated string for easy parsing and into a line chart with the months as x and stock prices as y. 
-Ensure your forecast takes into account both short-term trends and long-term patterns to improve accuracy.
-Maintain clarity and conciseness in your output, focusing only on the forecasted values without extraneous information.
-
-Context:
-The user will input a series of numerical values representing closing price, open price, high price, low price, and volume over a sequence of past periods (e.g., monthly closing price, open price, high price, low price, and volume for the past two years). Your task is to predict the stock prices for the next 12 periods based on this historical data. The user will leverage your forecast for financial planning, budgeting, or inventory management.
-
-Constraints:
-
-Do not assume any additional data beyond what the user provides (e.g., macroeconomic factors or market conditions).
-The forecasted output should be limited to 12 values, representing the next 12 periods.
-
-Examples:
-
-Input: [1200, 1350, 1500, 1450, 1600, 1700, 1550, 1650, 1800, 1750, 1900, 1850]
-Output: 1900, 1950, 2000, 2100, 2050, 2150, 2200, 2250, 2300, 2400, 2350, 2450
-
-Input: [100, 200, 300, 250, 350, 400, 450, 500, 550, 600, 650, 700]
-Output: 750, 800, 850, 900, 950, 1000, 1050, 1100, 1150, 1200, 1250, 1300
-"""
 System_Prompt_Explanation = """
 You are StockPrize Ally, AI-based Stock Price Forecast Explanation Model designed to provide clear, insightful interpretations of the forecasted values generated by the forecasting model. Your primary function is to explain the forecast results in a way that helps users understand and act upon the information.
 
@@ -112,90 +88,43 @@ with st.sidebar:
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
-# Define the get_embedding function
 logging.basicConfig(level=logging.INFO)
 
+FORECAST_ENGINES = ["Statistical (local)", "LLM (gpt-4o-mini)"]
+# Column names of the manually entered table, in the order the prompts expect
+MANUAL_COLUMNS = ["Closing Price", "Opening Price", "High Price", "Low Price", "Volume"]
 
-def get_embedding(document, engine="text-embedding-3-small"):
-    logging.info(f"Retrieving embedding for document: {document[:30]}...")  # Log the beginning of a document to identify calls
-    try:
-        response = openai.Embedding.create(
-            input=document,
-            model=engine
-        )
-        return response['data']['embedding']
-    except openai.error.OpenAIError as e:
-        logging.error(f"Failed to retrieve embedding: {e}")
-        return None
+# Reference history parsed into typed arrays once; later loads are memory-mapped from .price_cache/
+@st.cache_resource
+def load_history():
+    return load_prices(HISTORICAL_FILE)
 
+# Z-normalized closing-price windows of the reference history, one index per window length
+@st.cache_resource
+def load_analog_index(window=DEFAULT_WINDOW):
+    history = load_history()
+    return AnalogIndex(history.close, window=window, dates=history.dates)
 
-# Function to forecast stockprice
-def forecast_stock_price(data, columns):
-    # Prepare the input for the GPT model
-    
-    if isinstance(columns, list) and all(col in data.columns for col in columns):
-        # Convert selected column data into a single string per row, then join all rows
-        stock_price_data_str = ', '.join(data[columns].astype(str).apply(lambda row: ' '.join(row.values), axis=1))
-    else:
-        raise ValueError("Columns provided are not correctly specified or do not exist in the DataFrame")
-   
-    # RAG Implementation
-    # Load and prepare data for RAG
-    dataframed = pd.read_csv('https://raw.githubusercontent.com/11andrea2233/AI_Republic_Projects/refs/heads/main/05_StockPrize_Ally/HistoricalData_1726367135218.csv')
-    dataframed['combined'] = dataframed.apply(lambda row: ' '.join(row.values.astype(str)), axis=1)
-    documents = dataframed['combined'].tolist()
-
-    embeddings = [get_embedding(doc, engine="text-embedding-3-small") for doc in documents]
-    embedding_dim = len(embeddings[0])
-    embeddings_np = np.array(embeddings).astype('float32')
-
-    index = faiss.IndexFlatL2(embedding_dim)
-    index.add(embeddings_np)
-
-    # Generate embedding for the forecast string
-    query_embedding = get_embedding(stock_price_data_str, engine='text-embedding-3-small')
-    query_embedding_np = np.array([query_embedding]).astype('float32')
-
-    # Search for relevant documents
-    _, indices = index.search(query_embedding_np, 2)
-    retrieved_docs = [documents[i] for i in indices[0]]
-    context = ' '.join(retrieved_docs)
-
-    # Create a prompt for the GPT model
-    prompt = f"""
-    Given the following stock price data: {stock_price_data_str}, and the context: {context} forecast the next 12 periods of stock price. 
-    Return only the forecasted values as a comma-separated string."""
 
-    # Call the OpenAI API to generate the forecast
-    response = openai.ChatCompletion.create(
-        model="gpt-4o-mini",
-        temperature= 0.1,
-        messages=[
-            {"role": "system", "content": System_Prompt_Forecast},
-            {"role": "user", "content": prompt}
-        ]
-    )
-
-    # Extract the forecasted values from the response
-    forecasted_values = response['choices'][0]['message']['content']
-
-    # Print the response for debugging
-    print("API Response:", forecasted_values)
-
-    # Convert the forecasted values to a list of floats
+# Function to forecast stockprice
+def forecast_stock_price(data, columns, report=None):
+    # Context: the historical windows whose closing-price shape best matches the latest one
+    # in the user's data, and what happened after them. No embedding calls.
     try:
-        forecasted_data = [float(value) for value in forecasted_values.split(',')]
+        forecasted_data, context = forecast_with_llm(data, columns, load_analog_index, report=report)
     except ValueError as e:
         st.error("Error parsing forecasted values. Please check the API response.")
         print("Error:", e)
-        return None
+        return None, None
 
     return forecasted_data, context
 
 # Function to generate explanation using OpenAI API
-def generate_explanation(data, forecast):
-    # Prepare the historical data for the prompt
-    historical_data_str = data.to_string(index=False)  # Convert DataFrame to string for better readability
+def generate_explanation(data, forecast, columns=MANUAL_COLUMNS, report=None):
+    # Prepare the historical data for the prompt: a bounded digest instead of the whole table
+    historical_data_str = digest_text(typed_columns(data, columns), typed_dates(data))
+    if report is not None:
+        report.update(token_report(data.to_string(index=False), historical_data_str))
     forecast_str = ', '.join(map(str, forecast))  # Convert forecasted values to a string
 
     # Modify the prompt to focus on how the forecast was derived and analyze historical trends
@@ -221,6 +150,65 @@ def generate_explanation(data, forecast):
     
     return response.choices[0].message['content']
 
+# Forecast controls and results, shared by the CSV upload and manual entry paths
+def forecast_section(data, column_names):
+    # The local engine is deterministic and runs in milliseconds; the LLM is then only used for the explanation
+    engine = st.radio("Forecasting engine", FORECAST_ENGINES, horizontal=True)
+    method = st.selectbox("Method", METHODS, help="auto picks the method with the lowest error on the last 12 periods") if engine == FORECAST_ENGINES[0] else None
+    # Button to trigger forecasting
+    if st.button("Forecast Stock Prices"):
+        if engine == FORECAST_ENGINES[0]:
+            try:
+                result = statistical_forecast(typed_columns(data, column_names), method=method)
+            except ValueError as e:
+                # e.g. fewer than three periods entered
+                st.error(str(e))
+                forecast = None
+            else:
+                st.write("Forecasted Stock Prices (95% intervals):", result.to_frame(column_names))
+                st.caption(f"Methods: {', '.join(f'{column}: {name}' for column, name in zip(column_names, result.methods))}")
+                forecast = [round(value, 2) for value in result.mean[:, 0]]
+        else:
+            forecast_tokens = {}
+            forecast, context = forecast_stock_price(data, column_names, report=forecast_tokens)
+            st.write("Forecasted Stock Prices:", forecast)
+            if forecast_tokens:
+                st.caption(f"Forecast prompt: {forecast_tokens['before']} tokens with the full table, "
+                           f"{forecast_tokens['after']} with the digest")
+
+        if forecast is not None:
+            explanation_tokens = {}
+            explanation = generate_explanation(data, forecast, column_names, report=explanation_tokens)
+            st.write("Explanation:", explanation)
+            st.caption(f"Explanation prompt: {explanation_tokens['before']} tokens with the full table, "
+                       f"{explanation_tokens['after']} with the digest")
+
+            # Visualization, in ascending date order (or entry order when the data has no dates)
+            values = typed_columns(data, column_names)
+            dates = typed_dates(data)
+            periods = dates if dates is not None else range(len(values))
+            fig, ax = plt.subplots(figsize=(10, 5))
+            for i, column in enumerate(column_names[:4]):
+                ax.plot(periods, values[:, i], label=f'{column}', marker='o')
+
+            # Since volume might have a different scale, we plot it on a secondary y-axis
+            ax2 = ax.twinx()  # Create another axis that shares the same x-axis
+            ax2.plot(periods, values[:, 4], label=column_names[4], color='grey', linestyle='--')
+            ax2.set_ylabel('Volume')
+
+            # Labeling the plot
+            ax.set_title('Stock Price Data')
+            ax.set_xlabel('Date' if dates is not None else 'Period')
+            ax.set_ylabel('Price')
+
+            # Adding a legend to show labels
+            lines, labels = ax.get_legend_handles_labels()
+            lines2, labels2 = ax2.get_legend_handles_labels()
+            ax.legend(lines + lines2, labels + labels2, loc='upper left')
+
+            # Display the plot
+            st.pyplot(fig)
+
 # Home Page
 if options == "Home":
     st.title("Welcome to StockPrize Ally!🏆")
@@ -279,13 +267,7 @@ elif options == "StockPrize AI":
 
             # Ensure all selected columns exist in the DataFrame
             if all(col in data.columns for col in column_names):
-                # Button to trigger forecasting
-                if st.button("Forecast Stock Prices"):
-                    forecast, context = forecast_stock_price(data, column_names)
-                    st.write("Forecasted Stock Prices:", forecast)
-
-                    explanation = generate_explanation(data, forecast)  # Assuming this function is defined to use data and forecast
-                    st.write("Explanation:", explanation)
+                forecast_section(data, column_names)
             else:
                 st.error("One or more selected columns do not exist in the uploaded data. Please check your selections.")
     
@@ -321,44 +303,7 @@ elif options == "StockPrize AI":
 
             except ValueError:
                 st.error("Please ensure all data is properly formatted as comma-separated numerical values.")
+            else:
+                forecast_section(stock_price_data, MANUAL_COLUMNS)
         else:
             st.warning("Please fill out all fields to proceed.")
-
-
-    if 'data' in locals() and 'stock_price_columns' in locals():
-        if st.button("Forecast Stock Prices"):
-
-
-
-
-
-            forecast, prompt = forecast_stock_price(data, stock_price_columns)
-            if forecast is not None:    
-                st.write("Forecasted Stock Prices:", forecast)
-
-                explanation = generate_explanation(data, forecast)
-                st.write("Explanation:", explanation)
-
-                # Visualization
-                plt.figure(figsize=(10, 5))
-                for column in ['Closing Price', 'Opening Price', 'High Price', 'Low Price']:
-                    plt.plot(data.index, data[column], label=f'{column}', marker='o')
-
-                # Since volume might have a different scale, we plot it on a secondary y-axis
-                ax = plt.gca()  # Get current axis
-                ax2 = ax.twinx()  # Create another axis that shares the same x-axis
-                ax2.plot(data.index, data['Volume'], label='Volume', color='grey', linestyle='--')
-                ax2.set_ylabel('Volume')
-
-                # Labeling the plot
-                plt.title('Stock Price Data')
-                plt.xlabel('Date')
-                plt.ylabel('Price')
-
-                # Adding a legend to show labels
-                lines, labels = ax.get_legend_handles_labels()
-                lines2, labels2 = ax2.get_legend_handles_labels()
-                ax.legend(lines + lines2, labels + labels2, loc='upper left')
-
-                # Display the plot
-                plt.show()
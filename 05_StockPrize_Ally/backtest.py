@@ -0,0 +1,186 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analog_index import AnalogIndex
+from forecasting import forecast
+from llm_forecaster import MODEL, forecast_with_llm, mock_complete, openai_complete, prompt_hash
+from price_data import CACHE_DIR, HISTORICAL_FILE, TSLA_FILE, file_hash, load_prices, resolve_source
+
+# Walk-forward backtesting for StockPrize forecasters.
+# At each rolling origin the forecaster sees only the history up to the cutoff and predicts the
+# next `horizon` closing prices. Origins are spread over a process pool; each worker loads the
+# memory-mapped price arrays once. Results are cached per (file content, forecaster, horizon), plus
+# the prompt version and model name for LLM forecasters, so re-runs only compute origins that
+# have not been scored yet. Origins that failed are kept in the cache for the report but run again
+# on the next backtest, so a transient API error does not drop them for good.
+#
+# Forecasters:
+#   stat:<method>  local statistical engine (stat:auto, stat:drift, stat:ses, stat:holt, stat:ar, stat:naive)
+#   mock-llm       the LLM prompt/parse path answered by an in-process mock (no network)
+#   llm            the LLM prompt/parse path against the OpenAI API (or OPENAI_API_BASE)
+
+BACKTEST_CACHE_DIR = os.path.join(CACHE_DIR, "backtests")
+DEFAULT_HORIZON = 12
+DEFAULT_ORIGINS = 50
+DEFAULT_MIN_TRAIN = 250
+# Closing price first, as on the forecast page
+COLUMNS = ["close", "open", "high", "low", "volume"]
+FRAME_COLUMNS = ["Closing Price", "Opening Price", "High Price", "Low Price", "Volume"]
+
+_series = {}
+
+
+def load_matrix(filename):
+    # Per-process cache of the (n, 5) matrix; the underlying arrays are memory-mapped
+    if filename not in _series:
+        series = load_prices(filename)
+        _series[filename] = np.column_stack([getattr(series, column) for column in COLUMNS]).astype("float64")
+    return _series[filename]
+
+
+def llm_forecaster(complete):
+    def run(history, horizon):
+        # The prompt carries a bounded digest of the whole history plus the latest rows
+        frame = pd.DataFrame(history, columns=FRAME_COLUMNS)
+        # Analogs come from the history before the cutoff only, so no future data leaks in
+        closes = history[:, 0]
+        values, _ = forecast_with_llm(frame, FRAME_COLUMNS, lambda window: AnalogIndex(closes, window=window),
+                                      complete=complete)
+        return np.asarray(values[:horizon], dtype="float64")
+    return run
+
+
+def make_forecaster(spec):
+    # Returns f(history (n, 5), horizon) -> closing-price forecast of length horizon
+    if spec.startswith("stat:"):
+        method = spec.split(":", 1)[1]
+        return lambda history, horizon: forecast(history[:, :1], method, horizon).mean[:, 0]
+    if spec == "mock-llm":
+        return llm_forecaster(mock_complete)
+    if spec == "llm":
+        return llm_forecaster(openai_complete)
+    raise ValueError(f"Unknown forecaster '{spec}'")
+
+
+def run_origin(task):
+    filename, spec, cutoff, horizon = task
+    values = load_matrix(filename)
+    actual = values[cutoff:cutoff + horizon, 0]
+    start = time.perf_counter()
+    try:
+        predicted = make_forecaster(spec)(values[:cutoff], horizon)
+        error = None if len(predicted) == horizon else f"expected {horizon} values, got {len(predicted)}"
+    except Exception as e:
+        predicted, error = [], f"{type(e).__name__}: {e}"
+    return {"origin": cutoff, "seconds": time.perf_counter() - start, "error": error,
+            "predicted": [float(v) for v in predicted], "actual": actual.tolist()}
+
+
+def rolling_origins(n, horizon, count, min_train=DEFAULT_MIN_TRAIN):
+    # Evenly spaced cutoffs, each followed by a full horizon of actuals
+    last = n - horizon
+    if last < min_train:
+        raise ValueError(f"Need at least {min_train + horizon} periods; the file has {n}.")
+    return sorted(set(np.linspace(min_train, last, num=min(count, last - min_train + 1)).astype(int).tolist()))
+
+
+def cache_path(filename, spec, horizon):
+    key = f"{file_hash(resolve_source(filename))[:16]}-{spec.replace(':', '_')}-h{horizon}"
+    if spec in ("llm", "mock-llm"):
+        # A new prompt or model must not be served results produced by the old one
+        key += f"-p{prompt_hash()}-{MODEL if spec == 'llm' else 'mock'}"
+    return os.path.join(BACKTEST_CACHE_DIR, f"{os.path.splitext(filename)[0]}-{key}.json")
+
+
+def read_cache(path):
+    try:
+        with open(path) as f:
+            return {int(origin): result for origin, result in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cache(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({str(origin): result for origin, result in results.items()}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def backtest(filename, spec, horizon=DEFAULT_HORIZON, origins=DEFAULT_ORIGINS, min_train=DEFAULT_MIN_TRAIN,
+             workers=None):
+    cutoffs = rolling_origins(len(load_matrix(filename)), horizon, origins, min_train)
+    path = cache_path(filename, spec, horizon)
+    results = read_cache(path)
+    pending = [cutoff for cutoff in cutoffs if cutoff not in results or results[cutoff]["error"] is not None]
+
+    start = time.perf_counter()
+    if pending:
+        tasks = [(filename, spec, cutoff, horizon) for cutoff in pending]
+        chunksize = max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(run_origin, tasks, chunksize=chunksize):
+                results[result["origin"]] = result
+        write_cache(path, results)
+    wall_seconds = time.perf_counter() - start
+    return summarize([results[cutoff] for cutoff in cutoffs], horizon, spec, len(pending), wall_seconds)
+
+
+def summarize(results, horizon, spec, computed, wall_seconds):
+    scored = [result for result in results if result["error"] is None]
+    report = {"forecaster": spec, "origins": len(results), "computed": computed, "failed": len(results) - len(scored),
+              "wall_seconds": wall_seconds}
+    if scored:
+        predicted = np.asarray([result["predicted"] for result in scored])
+        actual = np.asarray([result["actual"] for result in scored])
+        errors = np.abs(predicted - actual)
+        report["mae"] = errors.mean(axis=0).tolist()
+        report["mape"] = (100 * np.nanmean(errors / np.where(actual == 0, np.nan, np.abs(actual)), axis=0)).tolist()
+        latencies = 1000 * np.asarray([result["seconds"] for result in results])
+        report["latency_ms"] = {"p50": float(np.percentile(latencies, 50)), "p95": float(np.percentile(latencies, 95)),
+                                "max": float(latencies.max())}
+    return report
+
+
+def print_report(report, horizon):
+    print(f"{report['forecaster']}: {report['origins']} origins ({report['computed']} computed, "
+          f"{report['failed']} failed) in {report['wall_seconds']:.2f}s")
+    if "mae" not in report:
+        return
+    latency = report["latency_ms"]
+    print(f"  latency per call: p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, max {latency['max']:.1f} ms")
+    print("  horizon " + " ".join(f"{h:>8}" for h in range(1, horizon + 1)))
+    print("  MAE     " + " ".join(f"{value:8.2f}" for value in report["mae"]))
+    print("  MAPE %  " + " ".join(f"{value:8.2f}" for value in report["mape"]))
+
+
+def main():
+    # python backtest.py --file TSLA-2.csv --forecaster stat:auto --forecaster mock-llm --origins 100
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of StockPrize forecasters.")
+    parser.add_argument("--file", default=HISTORICAL_FILE, choices=[HISTORICAL_FILE, TSLA_FILE])
+    parser.add_argument("--forecaster", action="append", help="stat:<method>, mock-llm or llm (repeatable)")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    parser.add_argument("--origins", type=int, default=DEFAULT_ORIGINS)
+    parser.add_argument("--min-train", type=int, default=DEFAULT_MIN_TRAIN)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--json", help="also write the reports to this file")
+    args = parser.parse_args()
+
+    reports = []
+    for spec in args.forecaster or ["stat:drift", "stat:auto", "mock-llm"]:
+        report = backtest(args.file, spec, args.horizon, args.origins, args.min_train, args.workers)
+        print_report(report, args.horizon)
+        reports.append(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import argparse
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+# Local statistical forecasting engine for StockPrize Ally.
+# Every method works on an (n periods, c columns) float64 matrix at once and returns point
+# forecasts with normal prediction intervals for the next `horizon` periods, in milliseconds and
+# deterministically. "auto" picks, per column, the method with the lowest error on a holdout of
+# the last `horizon` observations.
+#   naive - last value
+#   drift - random walk with drift (straight line from the first to the last observation)
+#   ses   - simple exponential smoothing, alpha chosen by one-step squared error
+#   holt  - Holt's linear trend, alpha/beta chosen by one-step squared error
+#   ar    - AR(p) on first differences fitted by least squares
+
+METHODS = ("auto", "naive", "drift", "ses", "holt", "ar")
+DEFAULT_HORIZON = 12
+DEFAULT_Z = 1.96  # 95% intervals
+AR_ORDER = 5
+SES_ALPHAS = np.linspace(0.05, 1.0, 20)
+HOLT_GRID = [(alpha, beta) for alpha in (0.2, 0.4, 0.6, 0.8, 1.0) for beta in (0.01, 0.05, 0.1, 0.2)]
+# Holt's recursion runs in Python over time; it only needs the recent history
+HOLT_FIT_WINDOW = 500
+# Fewest periods that leave each method at least one residual degree of freedom for sigma;
+# shorter histories fall back to drift (reported in Forecast.methods)
+MIN_PERIODS = {"naive": 3, "drift": 3, "ses": 3, "holt": 4, "ar": 5}
+
+
+class Forecast:
+    def __init__(self, mean, lower, upper, methods):
+        # mean/lower/upper: (horizon, c); methods: one method name per column
+        self.mean = mean
+        self.lower = lower
+        self.upper = upper
+        self.methods = methods
+
+    def to_frame(self, columns):
+        import pandas as pd
+        frame = {}
+        for i, column in enumerate(columns):
+            frame[column] = self.mean[:, i]
+            frame[f"{column} (low)"] = self.lower[:, i]
+            frame[f"{column} (high)"] = self.upper[:, i]
+        return pd.DataFrame(frame, index=pd.RangeIndex(1, len(self.mean) + 1, name="Period"))
+
+
+def as_matrix(values):
+    values = np.asarray(values, dtype="float64")
+    return values[:, None] if values.ndim == 1 else values
+
+
+def steps(horizon):
+    return np.arange(1, horizon + 1, dtype="float64")[:, None]
+
+
+def naive(y, horizon):
+    sigma = np.diff(y, axis=0).std(axis=0, ddof=1)
+    return np.repeat(y[-1:], horizon, axis=0), sigma * np.sqrt(steps(horizon))
+
+
+def drift(y, horizon):
+    n = len(y)
+    diffs = np.diff(y, axis=0)
+    slope = diffs.mean(axis=0)
+    sigma = diffs.std(axis=0, ddof=1)
+    h = steps(horizon)
+    return y[-1] + h * slope, sigma * np.sqrt(h * (1 + h / (n - 1)))
+
+
+def ses_levels(y, alpha):
+    # l_t = alpha * y_t + (1 - alpha) * l_{t-1}, l_0 = y_0, as a linear filter over all columns
+    levels = lfilter([alpha], [1.0, alpha - 1.0], y, axis=0)
+    decay = (1.0 - alpha) ** np.arange(1, len(y) + 1)[:, None]
+    return levels + decay * y[:1]
+
+
+def ses(y, horizon):
+    best = None
+    for alpha in SES_ALPHAS:
+        levels = ses_levels(y, alpha)
+        sse = ((y[1:] - levels[:-1]) ** 2).sum(axis=0)
+        if best is None:
+            best = [sse, np.full(y.shape[1], alpha), levels[-1]]
+        better = sse < best[0]
+        best[0] = np.where(better, sse, best[0])
+        best[1] = np.where(better, alpha, best[1])
+        best[2] = np.where(better, levels[-1], best[2])
+    sse, alpha, level = best
+    sigma = np.sqrt(sse / (len(y) - 2))
+    h = steps(horizon)
+    return np.repeat(level[None, :], horizon, axis=0), sigma * np.sqrt(1 + (h - 1) * alpha ** 2)
+
+
+def holt_filter(y, alpha, beta):
+    level, trend = y[0], y[1] - y[0]
+    sse = np.zeros(y.shape[1])
+    for value in y[1:]:
+        prediction = level + trend
+        sse += (value - prediction) ** 2
+        new_level = alpha * value + (1 - alpha) * prediction
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+    return level, trend, sse
+
+
+def holt(y, horizon):
+    y = y[-HOLT_FIT_WINDOW:]
+    best = None
+    for alpha, beta in HOLT_GRID:
+        level, trend, sse = holt_filter(y, alpha, beta)
+        if best is None:
+            best = {"sse": sse, "level": level, "trend": trend, "alpha": np.full_like(sse, alpha),
+                    "beta": np.full_like(sse, beta)}
+            continue
+        better = sse < best["sse"]
+        for key, value in (("sse", sse), ("level", level), ("trend", trend), ("alpha", alpha), ("beta", beta)):
+            best[key] = np.where(better, value, best[key])
+    h = steps(horizon)
+    sigma = np.sqrt(best["sse"] / (len(y) - 3))
+    # Var(e_h) = sigma^2 * (1 + sum_{j<h} (alpha * (1 + j * beta))^2)
+    weights = (best["alpha"] * (1 + steps(horizon - 1) * best["beta"])) ** 2
+    spread = np.sqrt(1 + np.vstack([np.zeros((1, y.shape[1])), np.cumsum(weights, axis=0)]))
+    return best["level"] + h * best["trend"], sigma * spread
+
+
+def ar(y, horizon, order=AR_ORDER):
+    diffs = np.diff(y, axis=0)
+    order = max(1, min(order, len(diffs) // 4))
+    mean = np.empty((horizon, y.shape[1]))
+    spread = np.empty((horizon, y.shape[1]))
+    for column in range(y.shape[1]):
+        d = diffs[:, column]
+        # Row t holds d[t-1], ..., d[t-order] for target d[t]
+        lags = sliding_window_view(d[:-1], order)[:, ::-1]
+        design = np.hstack([np.ones((len(lags), 1)), lags])
+        target = d[order:]
+        coef, *_ = np.linalg.lstsq(design, target, rcond=None)
+        sigma = np.std(target - design @ coef, ddof=order + 1)
+        history = list(d[-order:][::-1])
+        forecasts = []
+        for _ in range(horizon):
+            step = coef[0] + np.dot(coef[1:], history[:order])
+            forecasts.append(step)
+            history.insert(0, step)
+        mean[:, column] = y[-1, column] + np.cumsum(forecasts)
+        # psi weights of the AR on differences, accumulated for the integrated series
+        psi = np.zeros(horizon)
+        psi[0] = 1.0
+        for j in range(1, horizon):
+            psi[j] = np.dot(coef[1:1 + min(order, j)], psi[j - 1::-1][:order])
+        spread[:, column] = sigma * np.sqrt(np.cumsum(np.cumsum(psi) ** 2))
+    return mean, spread
+
+
+FORECASTERS = {"naive": naive, "drift": drift, "ses": ses, "holt": holt, "ar": ar}
+
+
+def select_methods(y, horizon):
+    # Holdout MAE of each method on the last `horizon` observations, per column
+    train, test = y[:-horizon], y[-horizon:]
+    errors = {name: np.abs(forecaster(train, horizon)[0] - test).mean(axis=0)
+              for name, forecaster in FORECASTERS.items()}
+    names = list(errors)
+    return [names[i] for i in np.argmin(np.vstack([errors[name] for name in names]), axis=0)]
+
+
+def forecast(values, method="auto", horizon=DEFAULT_HORIZON, z=DEFAULT_Z):
+    # values: (n,) or (n, c) in ascending time order
+    y = as_matrix(values)
+    if len(y) < 3:
+        raise ValueError("At least three periods of data are needed to forecast.")
+    if method == "auto":
+        methods = select_methods(y, horizon) if len(y) >= 2 * horizon + AR_ORDER + 2 else ["drift"] * y.shape[1]
+    elif method in FORECASTERS:
+        methods = [method if len(y) >= MIN_PERIODS[method] else "drift"] * y.shape[1]
+    else:
+        raise ValueError(f"Unknown method '{method}'. Choose one of {', '.join(METHODS)}.")
+
+    mean = np.empty((horizon, y.shape[1]))
+    spread = np.empty((horizon, y.shape[1]))
+    for name in set(methods):
+        columns = [i for i, m in enumerate(methods) if m == name]
+        mean[:, columns], spread[:, columns] = FORECASTERS[name](y[:, columns], horizon)
+    return Forecast(mean, mean - z * spread, mean + z * spread, methods)
+
+
+def main():
+    # python forecasting.py --file TSLA-2.csv
+    from price_data import COLUMNS, HISTORICAL_FILE, load_prices
+    parser = argparse.ArgumentParser(description="Time the local forecasting methods on an in-repo price history.")
+    parser.add_argument("--file", default=HISTORICAL_FILE)
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    args = parser.parse_args()
+
+    series = load_prices(args.file)
+    values = np.column_stack([getattr(series, column) for column in COLUMNS])
+    for method in METHODS:
+        start = time.perf_counter()
+        result = forecast(values, method, args.horizon)
+        seconds = time.perf_counter() - start
+        print(f"{method:<6} {1000 * seconds:7.1f} ms  close +{args.horizon}: {result.mean[-1, 3]:.2f} "
+              f"[{result.lower[-1, 3]:.2f}, {result.upper[-1, 3]:.2f}]  methods: {', '.join(result.methods)}")
+
+
+if __name__ == "__main__":
+    main()
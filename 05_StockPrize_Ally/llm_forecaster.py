@@ -0,0 +1,158 @@
+import hashlib
+import inspect
+import os
+import random
+import re
+import time
+
+import openai
+
+import price_digest
+from analog_index import DEFAULT_WINDOW, describe_matches
+from price_data import row_strings, typed_columns, typed_dates
+from price_digest import RECENT_ROWS, digest_text, token_report
+
+# LLM forecast path shared by the Streamlit page and the backtesting harness.
+# The model and the analog index are passed in, so the same prompt building and parsing can run
+# against the OpenAI API, a server behind OPENAI_API_BASE, or the in-process mock below.
+
+MODEL = "gpt-4o-mini"
+# Seconds the mock completion sleeps, to mimic API latency in backtests
+MOCK_LATENCY = float(os.environ.get("STOCKPRIZE_MOCK_LATENCY", "0"))
+MAX_RETRIES = 6
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.APIError,
+    openai.error.APIConnectionError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    openai.error.TryAgain,
+)
+
+System_Prompt_Forecast = """
+Role:
+You are StockPrize Ally, an AI-based Stock Price Forecasting Model designed to generate predictions of future stock prices based on historical data. Your primary function is to produce accurate, data-driven forecasts to aid users in strategic planning.
+
+Instructions:
+
+Accept a list of historical stock prices data as input, consisting of numerical values representing closing price, open price, high price, low price, and volume for past periods.
+Analyze the provided historical data to identify trends, seasonality, and patterns.
+Generate a stock prices forecast for the next 12 periods using appropriate statistical or machine learning models.
+Output the forecasted values as a comma-separated string for easy parsing and into a line chart with the months as x and stock prices as y. 
+Ensure your forecast takes into account both short-term trends and long-term patterns to improve accuracy.
+Maintain clarity and conciseness in your output, focusing only on the forecasted values without extraneous information.
+
+Context:
+The user will input a series of numerical values representing closing price, open price, high price, low price, and volume over a sequence of past periods (e.g., monthly closing price, open price, high price, low price, and volume for the past two years). Your task is to predict the stock prices for the next 12 periods based on this historical data. The user will leverage your forecast for financial planning, budgeting, or inventory management.
+
+Constraints:
+
+Do not assume any additional data beyond what the user provides (e.g., macroeconomic factors or market conditions).
+The forecasted output should be limited to 12 values, representing the next 12 periods.
+
+Examples:
+
+Input: [1200, 1350, 1500, 1450, 1600, 1700, 1550, 1650, 1800, 1750, 1900, 1850]
+Output: 1900, 1950, 2000, 2100, 2050, 2150, 2200, 2250, 2300, 2400, 2350, 2450
+
+Input: [100, 200, 300, 250, 350, 400, 450, 500, 550, 600, 650, 700]
+Output: 750, 800, 850, 900, 950, 1000, 1050, 1100, 1150, 1200, 1250, 1300
+"""
+
+
+def analog_context(closes, get_analog_index):
+    # get_analog_index(window) -> AnalogIndex over the reference history
+    window = min(DEFAULT_WINDOW, len(closes))
+    if window < 3:
+        return "No historical analogs (too few periods)."
+    matches = get_analog_index(window).query(closes[-window:])
+    return f"Most similar past {window}-period windows in the reference history:\n{describe_matches(matches)}"
+
+
+def format_row(row):
+    # Fixed precision so the prompt keeps the source's cents and whole share counts
+    # (closing, opening, high, low to 2 decimals, then volume as an integer)
+    return ' '.join([*(f"{value:.2f}" for value in row[:4]), *(f"{value:.0f}" for value in row[4:])])
+
+
+def forecast_prompt(data, columns, get_analog_index):
+    # Returns (prompt, context); columns start with the closing price
+    if not (isinstance(columns, list) and all(col in data.columns for col in columns)):
+        raise ValueError("Columns provided are not correctly specified or do not exist in the DataFrame")
+    # A bounded digest of the whole history plus the latest rows verbatim, instead of every row
+    values = typed_columns(data, columns)
+    digest = digest_text(values, typed_dates(data))
+    recent = values[-RECENT_ROWS:]
+    stock_price_data_str = ', '.join(format_row(row) for row in recent)
+    context = analog_context(values[:, 0], get_analog_index)
+    prompt = f"""
+    Summary of the full stock price history (columns: closing, opening, high, low, volume):
+    {digest}
+
+    Given the summary above, the latest {len(recent)} periods of stock price data: {stock_price_data_str}, and the context: {context} forecast the next 12 periods of stock price. 
+    Return only the forecasted values as a comma-separated string."""
+    return prompt, context
+
+
+def prompt_hash():
+    # Changes whenever the system prompt or the code that builds the user prompt changes,
+    # so cached LLM backtest results are not reused across prompt versions
+    parts = [System_Prompt_Forecast, inspect.getsource(price_digest)]
+    parts += [inspect.getsource(function) for function in (format_row, analog_context, forecast_prompt, describe_matches)]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def retry_after(error):
+    headers = getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def with_backoff(call, max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+    # Exponential backoff with full jitter; a server-provided Retry-After wins when present
+    for attempt in range(max_retries + 1):
+        try:
+            return call()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            time.sleep(delay)
+
+
+def openai_complete(messages, model=MODEL, temperature=0.1):
+    response = with_backoff(lambda: openai.ChatCompletion.create(model=model, temperature=temperature, messages=messages))
+    return response['choices'][0]['message']['content']
+
+
+def mock_complete(messages, horizon=12):
+    # Answers like the forecast model would: a drift extrapolation of the closing prices in the prompt
+    prompt = messages[-1]["content"]
+    section = re.search(r"stock price data: (.*?), and the context:", prompt, re.DOTALL)
+    rows = section.group(1).split(", ") if section else []
+    closes = [float(row.split()[0].replace("$", "").replace(",", "")) for row in rows if row.strip()]
+    time.sleep(MOCK_LATENCY)
+    if not closes:
+        return ", ".join(["0"] * horizon)
+    slope = (closes[-1] - closes[0]) / max(len(closes) - 1, 1)
+    return ", ".join(f"{closes[-1] + slope * h:.2f}" for h in range(1, horizon + 1))
+
+
+def forecast_with_llm(data, columns, get_analog_index, complete=openai_complete, report=None):
+    # Returns (forecasted values, context); raises ValueError when the answer cannot be parsed.
+    # Fills report with the prompt tokens of the old full-table dump vs this prompt.
+    prompt, context = forecast_prompt(data, columns, get_analog_index)
+    if report is not None:
+        report.update(token_report(', '.join(row_strings(data, columns)), prompt))
+    forecasted_values = complete([
+        {"role": "system", "content": System_Prompt_Forecast},
+        {"role": "user", "content": prompt}
+    ])
+    return [float(value) for value in forecasted_values.split(',')], context
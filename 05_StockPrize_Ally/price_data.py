@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import shutil
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+# Typed loader for the price histories shipped with StockPrize Ally.
+#   HistoricalData_*.csv - Nasdaq export: MM/DD/YYYY dates, "$230.29" prices, newest row first
+#   TSLA-2.csv           - Yahoo Finance export: ISO dates, plain floats, "Adj Close", oldest row first
+# Both are parsed once into ascending float64/int64 column arrays and cached as .npy files that are
+# memory-mapped on later loads. The cache is invalidated when the source file's mtime or size changes
+# and its content hash differs. Files are read from this folder first and only downloaded from
+# GitHub when missing.
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("STOCKPRIZE_CACHE_DIR", os.path.join(DATA_DIR, ".price_cache"))
+REMOTE_BASE_URL = "https://raw.githubusercontent.com/11andrea2233/AI_Republic_Projects/refs/heads/main/05_StockPrize_Ally/"
+HISTORICAL_FILE = "HistoricalData_1726367135218.csv"
+TSLA_FILE = "TSLA-2.csv"
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+COLUMNS = PRICE_COLUMNS + ("volume",)
+META_FILE = "meta.json"
+
+
+class PriceSeries:
+    # Daily OHLCV history in ascending date order; every column is a 1-D NumPy array
+    def __init__(self, dates, open, high, low, close, volume, adj_close=None, name=""):
+        self.dates = dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.adj_close = adj_close
+        self.name = name
+
+    def __len__(self):
+        return len(self.dates)
+
+    def columns(self):
+        names = ["dates", *COLUMNS] + (["adj_close"] if self.adj_close is not None else [])
+        return {column: getattr(self, column) for column in names}
+
+    def to_frame(self):
+        return pd.DataFrame(self.columns())
+
+    def tail(self, n):
+        return PriceSeries(**{column: values[-n:] for column, values in self.columns().items()}, name=self.name)
+
+
+def parse_money(series):
+    # "$230.29" -> 230.29; already-numeric columns pass through
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype="float64")
+    cleaned = series.astype(str).str.replace(r"[$,\s]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype="float64")
+
+
+def normalize_column(name):
+    return str(name).strip().lower().replace(" ", "_").replace("/", "_")
+
+
+def parse_prices(frame, name=""):
+    # Accepts either export format (or any CSV with Date/Open/High/Low/Close/Volume columns)
+    frame = frame.rename(columns=normalize_column)
+    if "close_last" in frame.columns:
+        frame = frame.rename(columns={"close_last": "close"})
+    missing = [column for column in ("date", *COLUMNS) if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Price data is missing columns: {', '.join(missing)}")
+
+    dates = frame["date"].astype(str).str.strip()
+    date_format = "%m/%d/%Y" if dates.str.contains("/").any() else "%Y-%m-%d"
+    columns = {"dates": pd.to_datetime(dates, format=date_format).to_numpy(dtype="datetime64[D]")}
+    for column in PRICE_COLUMNS:
+        columns[column] = parse_money(frame[column])
+    volume = pd.to_numeric(frame["volume"].astype(str).str.replace(",", "", regex=False), errors="coerce")
+    columns["volume"] = volume.fillna(0).to_numpy(dtype="int64")
+    if "adj_close" in frame.columns:
+        columns["adj_close"] = parse_money(frame["adj_close"])
+
+    order = np.argsort(columns["dates"], kind="stable")
+    return PriceSeries(**{column: np.ascontiguousarray(values[order]) for column, values in columns.items()},
+                       name=name)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resolve_source(filename, data_dir=DATA_DIR, cache_dir=CACHE_DIR):
+    # Local copy first, then a previously downloaded copy, then GitHub
+    local_path = os.path.join(data_dir, filename)
+    if os.path.exists(local_path):
+        return local_path
+    downloaded = os.path.join(cache_dir, "downloads", filename)
+    if not os.path.exists(downloaded):
+        os.makedirs(os.path.dirname(downloaded), exist_ok=True)
+        with urllib.request.urlopen(REMOTE_BASE_URL + urllib.request.quote(filename)) as response, \
+                open(f"{downloaded}.tmp", "wb") as f:
+            shutil.copyfileobj(response, f)
+        os.replace(f"{downloaded}.tmp", downloaded)
+    return downloaded
+
+
+def read_meta(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(path, meta):
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def load_cached(cache_path, meta):
+    columns = {column: np.load(os.path.join(cache_path, f"{column}.npy"), mmap_mode="r")
+               for column in meta["columns"]}
+    return PriceSeries(**columns, name=meta["name"])
+
+
+def load_prices(filename=HISTORICAL_FILE, data_dir=DATA_DIR, cache_dir=CACHE_DIR):
+    source = resolve_source(filename, data_dir, cache_dir)
+    stat = os.stat(source)
+    cache_path = os.path.join(cache_dir, os.path.splitext(filename)[0])
+    meta_path = os.path.join(cache_path, META_FILE)
+    meta = read_meta(meta_path)
+
+    if meta is not None and (meta["mtime_ns"], meta["size"]) == (stat.st_mtime_ns, stat.st_size):
+        return load_cached(cache_path, meta)
+    content_hash = file_hash(source)
+    if meta is not None and meta["sha256"] == content_hash:
+        # Touched but unchanged (e.g. a fresh checkout); keep the arrays
+        write_meta(meta_path, {**meta, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size})
+        return load_cached(cache_path, meta)
+
+    series = parse_prices(pd.read_csv(source), name=filename)
+    os.makedirs(cache_path, exist_ok=True)
+    columns = series.columns()
+    for column, values in columns.items():
+        np.save(os.path.join(cache_path, f"{column}.npy"), values)
+    write_meta(meta_path, {"name": filename, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                           "sha256": content_hash, "rows": len(series), "columns": list(columns)})
+    return load_cached(cache_path, {"name": filename, "columns": list(columns)})
+
+
+def frame_dates(frame):
+    # Parsed Date column of an uploaded table, or None when there is no usable one
+    date_columns = [column for column in frame.columns if normalize_column(column) == "date"]
+    if not date_columns:
+        return None
+    dates = pd.to_datetime(frame[date_columns[0]], errors="coerce")
+    return dates.to_numpy(dtype="datetime64[D]") if dates.notna().all() else None
+
+
+def typed_columns(frame, columns):
+    # Selected columns of an uploaded table as an (n, c) float64 matrix in ascending date order
+    values = np.column_stack([parse_money(frame[column]) for column in columns])
+    dates = frame_dates(frame)
+    return values[np.argsort(dates, kind="stable")] if dates is not None else values
+
+
+def typed_dates(frame):
+    dates = frame_dates(frame)
+    return np.sort(dates, kind="stable") if dates is not None else None
+
+
+def row_strings(frame, columns):
+    # Space-joined row strings built column by column instead of DataFrame.apply(axis=1)
+    values = frame[columns].astype(str)
+    first, rest = values.iloc[:, 0], [values.iloc[:, i] for i in range(1, values.shape[1])]
+    return first.str.cat(rest, sep=" ").tolist() if rest else first.tolist()
@@ -0,0 +1,203 @@
+import argparse
+
+import numpy as np
+
+# Bounded-size statistical digest of a price history for the StockPrize prompts.
+# Instead of pasting every row into the prompt, the history is reduced in NumPy to resampled
+# weekly/monthly OHLCV bars, return and volatility statistics, drawdowns, moving averages and
+# detected regime changes. The digest stays the same size whether the file has 50 rows or 10 years.
+
+TRADING_DAYS = 252
+MOVING_AVERAGES = (20, 50, 200)
+MAX_WEEKS = 12
+MAX_MONTHS = 24
+MAX_REGIME_CHANGES = 6
+RECENT_ROWS = 30
+VOLATILITY_WINDOW = 20
+# Without dates, bars are fixed blocks of this many periods
+BLOCK_SIZES = {"weekly": 5, "monthly": 21}
+
+
+def bar_starts(n, dates, unit):
+    # First row of every week/month (or fixed-size block when there are no dates)
+    if dates is None:
+        return np.arange(0, n, BLOCK_SIZES["weekly" if unit == "W" else "monthly"])
+    days = np.asarray(dates).astype("datetime64[D]")
+    # NumPy weeks start on Thursday (1970-01-01); shift so that bars run Monday to Sunday
+    periods = (days + 3).astype("datetime64[W]") if unit == "W" else days.astype(f"datetime64[{unit}]")
+    return np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+
+
+def resample(open, high, low, close, volume, dates, unit, limit):
+    starts = bar_starts(len(close), dates, unit)
+    ends = np.r_[starts[1:], len(close)] - 1
+    bars = {
+        "open": open[starts],
+        "high": np.maximum.reduceat(high, starts),
+        "low": np.minimum.reduceat(low, starts),
+        "close": close[ends],
+        "volume": np.add.reduceat(volume.astype("float64"), starts),
+    }
+    labels = (np.asarray(dates)[starts].astype("datetime64[D]").astype(str) if dates is not None
+              else np.char.add("#", starts.astype(str)))
+    return labels[-limit:], {key: values[-limit:] for key, values in bars.items()}
+
+
+def moving_average(values, window):
+    if len(values) < window:
+        return None
+    cumulative = np.cumsum(np.r_[0.0, values])
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+
+def drawdowns(close):
+    peaks = np.maximum.accumulate(close)
+    depth = close / peaks - 1.0
+    trough = int(np.argmin(depth))
+    peak = int(np.argmax(close[:trough + 1])) if trough else 0
+    return float(depth[trough]), peak, trough, float(depth[-1])
+
+
+def period_label(dates):
+    # Row index -> printable date (or "#row" when the data has no dates)
+    if dates is None:
+        return lambda i: f"#{i}"
+    days = np.asarray(dates).astype("datetime64[D]")
+    return lambda i: str(days[i])
+
+
+def regime_changes(close, dates, limit=MAX_REGIME_CHANGES):
+    # Trend regime: close above/below its 50-period average. Volatility regime: 20-period
+    # volatility above/below its median. Reports the latest points where either label flips.
+    changes = []
+    average = moving_average(close, 50)
+    if average is not None:
+        above = close[49:] > average
+        for i in np.flatnonzero(above[1:] != above[:-1]) + 1:
+            changes.append((i + 49, "uptrend (close above 50-period average)" if above[i] else
+                            "downtrend (close below 50-period average)"))
+    returns = np.diff(np.log(close))
+    if len(returns) > 2 * VOLATILITY_WINDOW:
+        windows = np.lib.stride_tricks.sliding_window_view(returns, VOLATILITY_WINDOW)
+        volatility = windows.std(axis=1)
+        high = volatility > np.median(volatility)
+        for i in np.flatnonzero(high[1:] != high[:-1]) + 1:
+            changes.append((i + VOLATILITY_WINDOW, "high volatility" if high[i] else "low volatility"))
+    changes.sort()
+    label = period_label(dates)
+    return [(label(i), description) for i, description in changes[-limit:]]
+
+
+def build_digest(open, high, low, close, volume, dates=None):
+    # All inputs are 1-D arrays in ascending time order
+    open, high, low, close = (np.asarray(values, dtype="float64") for values in (open, high, low, close))
+    volume = np.asarray(volume, dtype="float64")
+    returns = np.diff(np.log(close)) if len(close) > 1 else np.empty(0)
+    depth, peak, trough, current_drawdown = drawdowns(close)
+    label = period_label(dates)
+
+    digest = {
+        "periods": len(close),
+        "start": label(0),
+        "end": label(len(close) - 1),
+        "first_close": float(close[0]),
+        "last_close": float(close[-1]),
+        "total_return": float(close[-1] / close[0] - 1.0),
+        "high": float(high.max()),
+        "low": float(low.min()),
+        "mean_volume": float(volume.mean()),
+        "max_drawdown": depth,
+        "max_drawdown_span": (label(peak), label(trough)),
+        "current_drawdown": current_drawdown,
+        "moving_averages": {},
+        "regime_changes": regime_changes(close, dates),
+        "weekly": resample(open, high, low, close, volume, dates, "W", MAX_WEEKS),
+        "monthly": resample(open, high, low, close, volume, dates, "M", MAX_MONTHS),
+    }
+    if len(returns) > 1:
+        digest["mean_return"] = float(returns.mean())
+        digest["volatility"] = float(returns.std(ddof=1))
+        digest["annualized_volatility"] = float(returns.std(ddof=1) * np.sqrt(TRADING_DAYS))
+        digest["recent_volatility"] = float(returns[-VOLATILITY_WINDOW:].std(ddof=1)) if len(returns) > 2 else None
+        digest["best_period"] = float(returns.max())
+        digest["worst_period"] = float(returns.min())
+    for window in MOVING_AVERAGES:
+        average = moving_average(close, window)
+        if average is not None:
+            digest["moving_averages"][window] = float(average[-1])
+    return digest
+
+
+def format_bars(labels, bars):
+    rows = [f"{label}: O {o:.2f} H {h:.2f} L {l:.2f} C {c:.2f} V {v:.0f}"
+            for label, o, h, l, c, v in zip(labels, bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"])]
+    return "\n".join(rows)
+
+
+def format_digest(digest):
+    lines = [
+        f"Periods: {digest['periods']} ({digest['start']} to {digest['end']})",
+        f"Close: first {digest['first_close']:.2f}, last {digest['last_close']:.2f}, "
+        f"total return {100 * digest['total_return']:+.1f}%; range {digest['low']:.2f}-{digest['high']:.2f}",
+        f"Max drawdown {100 * digest['max_drawdown']:.1f}% ({digest['max_drawdown_span'][0]} to "
+        f"{digest['max_drawdown_span'][1]}); current drawdown {100 * digest['current_drawdown']:.1f}%",
+        f"Mean volume {digest['mean_volume']:.0f}",
+    ]
+    if "volatility" in digest:
+        recent = digest["recent_volatility"]
+        lines.append(f"Per-period log return: mean {100 * digest['mean_return']:+.3f}%, volatility "
+                     f"{100 * digest['volatility']:.2f}% (annualized {100 * digest['annualized_volatility']:.1f}%"
+                     + (f", last {VOLATILITY_WINDOW} periods {100 * recent:.2f}%" if recent is not None else "")
+                     + f"); best {100 * digest['best_period']:+.1f}%, worst {100 * digest['worst_period']:+.1f}%")
+    if digest["moving_averages"]:
+        lines.append("Moving averages: " + ", ".join(
+            f"{window}-period {value:.2f} (close {100 * (digest['last_close'] / value - 1):+.1f}%)"
+            for window, value in digest["moving_averages"].items()))
+    if digest["regime_changes"]:
+        lines.append("Regime changes: " + "; ".join(f"{when} {what}" for when, what in digest["regime_changes"]))
+    lines.append(f"Monthly bars (last {len(digest['monthly'][0])}):\n{format_bars(*digest['monthly'])}")
+    lines.append(f"Weekly bars (last {len(digest['weekly'][0])}):\n{format_bars(*digest['weekly'])}")
+    return "\n".join(lines)
+
+
+def digest_text(values, dates=None):
+    # values: (n, 5) matrix in the page's column order (close, open, high, low, volume)
+    close, open, high, low, volume = (values[:, i] for i in range(5))
+    return format_digest(build_digest(open, high, low, close, volume, dates))
+
+
+def count_tokens(text, model="gpt-4o-mini"):
+    import tiktoken
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Older tiktoken releases do not know the gpt-4o family yet
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return len(encoding.encode(text))
+
+
+def token_report(before, after):
+    before_tokens, after_tokens = count_tokens(before), count_tokens(after)
+    return {"before": before_tokens, "after": after_tokens,
+            "reduction": 1 - after_tokens / before_tokens if before_tokens else 0.0}
+
+
+def main():
+    # python price_digest.py --file TSLA-2.csv
+    from price_data import COLUMNS, HISTORICAL_FILE, load_prices
+    parser = argparse.ArgumentParser(description="Print the prompt digest of an in-repo price history and its token savings.")
+    parser.add_argument("--file", default=HISTORICAL_FILE)
+    args = parser.parse_args()
+
+    series = load_prices(args.file)
+    frame = series.to_frame()
+    values = np.column_stack([series.close, series.open, series.high, series.low, series.volume])
+    text = digest_text(values, series.dates)
+    print(text)
+    report = token_report(frame[["dates", *COLUMNS]].to_string(index=False), text)
+    print(f"\nPrompt tokens: full table {report['before']}, digest {report['after']} "
+          f"({100 * report['reduction']:.1f}% fewer)")
+
+
+if __name__ == "__main__":
+    main()